@@ -6,14 +6,13 @@ This is the main entry point for the agentic research tool built with OpenAI Age
 It provides AI-powered research capabilities with critique functionality.
 """
 
-import asyncio
 import sys
 import os
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from main import main
+from main import run_main
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(run_main())
\ No newline at end of file
@@ -4,10 +4,30 @@ import argparse
 import os
 import sys
 from typing import Optional
-from config import OPENAI_API_KEY, DEFAULT_QUERY, RESULTS_DIR
+from config import (
+    OPENAI_API_KEY, DEFAULT_QUERY, RESULTS_DIR, RESEARCH_RESULTS_PATH, CRITIQUE_RESULTS_PATH,
+    MODEL_CRITIQUE, MODEL_FINAL_REPORT, FLEX_MODELS
+)
 
-def create_parser() -> argparse.ArgumentParser:
-    """Create command line argument parser."""
+# Static banners, built once at import
+_WELCOME_BANNER = "🔍 Agentic Research Tool\n" + "=" * 40 + "\n"
+_CRITIQUE_MODE_BANNER = "\n📝 Critique Mode\n" + "-" * 20 + "\n"
+_RESEARCH_MODE_BANNER = "\n🔍 Research Mode\n" + "-" * 20 + "\n"
+
+# Message prefixes for the display_* helpers
+_PREFIX = {
+    "error": "❌ Error: ",
+    "success": "✅ ",
+    "info": "ℹ️  ",
+    "warning": "⚠️  ",
+    "processing": "🔄 ",
+}
+
+_RULE = "=" * 60
+_FINAL_REPORT_MODE_BANNER = f"\n{_RULE}\n{_PREFIX['info']}📊 Final Report Mode\n{_RULE}\n"
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the command line argument parser."""
     
     parser = argparse.ArgumentParser(
         description="Agentic Research Tool - AI-powered research with critique capabilities",
@@ -86,8 +106,35 @@ Examples:
         help="Enable iterative research-critique loop (critique can request more research)"
     )
     
+    parser.add_argument(
+        "--save-raw-events",
+        action="store_true",
+        help="Save raw streaming events to results/ (always on with --verbose)"
+    )
+    
+    parser.add_argument(
+        "--flex",
+        action="store_true",
+        help="Use the flex service tier for critique and final report (lower cost, slower responses)"
+    )
+    
     return parser
 
+# Built once at import; parse_args() does not mutate the parser
+_PARSER = _build_parser()
+
+def create_parser() -> argparse.ArgumentParser:
+    """Get the command line argument parser."""
+    return _PARSER
+
+def _list_results_dir() -> set:
+    """Return the names of regular files in the results directory (empty if it does not exist)."""
+    try:
+        with os.scandir(RESULTS_DIR) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except FileNotFoundError:
+        return set()
+
 def validate_args(args: argparse.Namespace) -> tuple[bool, Optional[str]]:
     """
     Validate command line arguments.
@@ -100,34 +147,46 @@ def validate_args(args: argparse.Namespace) -> tuple[bool, Optional[str]]:
     if not OPENAI_API_KEY:
         return False, "OPENAI_API_KEY environment variable is required"
     
+    # Argument-only checks first, before any filesystem access
+    if args.critique_only and not args.query:
+        return False, "Critique-only mode requires --query (original query)"
+    if args.final_report_only and not args.query:
+        return False, "Final-report-only mode requires --query (original query)"
+    
+    needs_default_input = args.critique_only and not args.input_file
+    if needs_default_input or args.final_report_only:
+        # One directory listing instead of a stat() per expected file
+        existing = _list_results_dir()
+    
     # Check critique-only mode requirements
-    if args.critique_only:
-        if not args.input_file:
-            # Use default input file location
-            default_input = os.path.join(RESULTS_DIR, "research_results.txt")
-            if os.path.exists(default_input):
-                args.input_file = default_input
-                print(f"Using default input file: {args.input_file}")
-            else:
-                return False, f"Critique-only mode requires --input-file (default {default_input} not found)"
-        if not args.query:
-            return False, "Critique-only mode requires --query (original query)"
+    if needs_default_input:
+        # Use default input file location
+        default_input = RESEARCH_RESULTS_PATH
+        if "research_results.txt" in existing:
+            args.input_file = default_input
+            print(f"Using default input file: {args.input_file}")
+        else:
+            return False, f"Critique-only mode requires --input-file (default {default_input} not found)"
     
     # Check final-report-only mode requirements
     if args.final_report_only:
-        default_research = os.path.join(RESULTS_DIR, "research_results.txt")
-        default_critique = os.path.join(RESULTS_DIR, "critique_results.txt")
+        default_research = RESEARCH_RESULTS_PATH
+        default_critique = CRITIQUE_RESULTS_PATH
         
-        if not os.path.exists(default_research):
+        if "research_results.txt" not in existing:
             return False, f"Final-report-only mode requires existing research results at {default_research}"
-        if not os.path.exists(default_critique):
+        if "critique_results.txt" not in existing:
             return False, f"Final-report-only mode requires existing critique results at {default_critique}"
-        if not args.query:
-            return False, "Final-report-only mode requires --query (original query)"
         
         print(f"Using research file: {default_research}")
         print(f"Using critique file: {default_critique}")
     
+    # The flex tier is only offered for some models; the others run on the standard tier
+    if args.flex:
+        for model in dict.fromkeys((MODEL_CRITIQUE, MODEL_FINAL_REPORT)):
+            if model not in FLEX_MODELS:
+                print(f"Note: {model} does not support the flex service tier, using the standard tier for it")
+    
     # Check query requirement for non-critique-only modes
     if not args.critique_only and not args.query:
         # Use default query if none provided
@@ -144,37 +203,45 @@ def get_effective_query(args: argparse.Namespace) -> str:
 
 def display_welcome():
     """Display welcome message."""
-    print("🔍 Agentic Research Tool")
-    print("=" * 40)
+    sys.stdout.write(_WELCOME_BANNER)
+
+def _emit(level: str, message: str, stream=None):
+    """Write a message with its level prefix in a single write."""
+    (stream or sys.stdout).write(_PREFIX[level] + message + "\n")
 
 def display_error(message: str):
-    """Display error message and exit."""
-    print(f"❌ Error: {message}", file=sys.stderr)
-    sys.exit(1)
+    """Display error message on stderr; callers decide the exit code."""
+    _emit("error", message, sys.stderr)
 
 def display_success(message: str):
     """Display success message."""
-    print(f"✅ {message}")
+    _emit("success", message)
 
 def display_info(message: str):
     """Display info message."""
-    print(f"ℹ️  {message}")
+    _emit("info", message)
 
 def display_warning(message: str):
     """Display warning message."""
-    print(f"⚠️  {message}")
+    _emit("warning", message)
 
 def display_processing(message: str):
     """Display processing message."""
-    print(f"🔄 {message}")
+    _emit("processing", message)
 
 def display_critique_mode():
     """Display critique mode header."""
-    print("\n📝 Critique Mode")
-    print("-" * 20)
+    sys.stdout.write(_CRITIQUE_MODE_BANNER)
 
 def display_research_mode():
     """Display research mode header."""
-    print("\n🔍 Research Mode")
-    print("-" * 20)
+    sys.stdout.write(_RESEARCH_MODE_BANNER)
+
+def display_final_report_mode():
+    """Display final report mode header."""
+    sys.stdout.write(_FINAL_REPORT_MODE_BANNER)
+
+def display_output(title: str, content: str):
+    """Display agent output framed by a titled banner in a single write."""
+    sys.stdout.write(f"\n{_RULE}\n{title}\n{_RULE}\n{content}\n{_RULE}\n\n")
 
@@ -1,10 +1,16 @@
 """Configuration for the agentic research tool."""
 
+import asyncio
 import os
+import weakref
 from typing import Optional
-from dotenv import load_dotenv
+from openai import AsyncOpenAI
 
-load_dotenv(override=True)
+# Only read .env when the key isn't already in the environment (e.g. container deployments)
+_ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if not os.environ.get("OPENAI_API_KEY") and os.path.exists(_ENV_PATH):
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_PATH, override=True)
 
 # API Configuration
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
@@ -19,16 +25,51 @@ MAX_TURNS_RESEARCH = 15
 MAX_TURNS_CRITIQUE = 25
 MAX_TURNS_FINAL_REPORT = 15
 
+# Service tier used for critique and final report when --flex is given
+# (lower price, higher latency; only supported by some models)
+SERVICE_TIER_FLEX = "flex"
+# Models that accept the flex tier; other models keep the standard tier under --flex
+FLEX_MODELS = frozenset({"o3", "o4-mini", "gpt-5", "gpt-5-mini", "gpt-5-nano"})
+
+# Tool rate limits in requests per second, keyed by host ("deepwiki" for the MCP server);
+# hosts without an entry use "default"
+TOOL_QPS = {"deepwiki": 2, "default": 4}
+# Batch URL verification: parallel checks per call and maximum URLs per call
+VERIFY_CONCURRENCY = 10
+VERIFY_URLS_MAX = 100
+# Maximum DeepWiki questions per ask_questions_batch call
+ASK_QUESTIONS_MAX = 5
+
+# Standard-tier OpenAI prices in USD per 1M tokens, used for the final report's cost table.
+# Reasoning tokens are billed as output; cached=None means no cached-input discount.
+PRICING_UPDATED = "2025-07-01"
+MODEL_PRICING = {
+    "o4-mini-deep-research": {"input": 2.00, "cached": 0.50, "output": 8.00},
+    "o3-deep-research": {"input": 10.00, "cached": 2.50, "output": 40.00},
+    "o3-pro": {"input": 20.00, "cached": None, "output": 80.00},
+    "o3": {"input": 2.00, "cached": 0.50, "output": 8.00},
+    "o4-mini": {"input": 1.10, "cached": 0.275, "output": 4.40},
+}
+
 # File Configuration
 RESULTS_DIR = "results"
+# Result file paths, joined once at import
+RESEARCH_RESULTS_PATH = os.path.join(RESULTS_DIR, "research_results.txt")
+RESEARCH_RESULTS_JSON_PATH = os.path.join(RESULTS_DIR, "research_results.json")
+CRITIQUE_RESULTS_PATH = os.path.join(RESULTS_DIR, "critique_results.txt")
+FINAL_REPORT_PATH = os.path.join(RESULTS_DIR, "final_report.md")
+TOKEN_USAGE_PATH = os.path.join(RESULTS_DIR, "token_usage.json")
+
 DEFAULT_QUERY = (
     "Find if Microsoft 365 Copilot has SOC2 and HIPAA compliance. "
     "Do not be distracted with other products under Copilot brand. "
     "Ground your answers in official data from Microsoft."
 )
 
-# Ensure results directory exists
-os.makedirs(RESULTS_DIR, exist_ok=True)
+def ensure_results_dir() -> str:
+    """Create the results directory if it is missing (checked on every call, so it is recreated if removed)."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    return RESULTS_DIR
 
 # Exit codes for different failure types
 EXIT_SUCCESS = 0
@@ -38,6 +79,18 @@ EXIT_CRITIQUE_AGENT_ERROR = 3
 EXIT_FINAL_REPORT_AGENT_ERROR = 4
 EXIT_GENERAL_ERROR = 5
 
+# OpenAI clients shared by all agent runs, one per event loop (connection pools are loop-bound)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+def get_async_client() -> AsyncOpenAI:
+    """Get the OpenAI client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        _async_clients[loop] = client
+    return client
+
 # Configuration validation utility
 def validate_config() -> bool:
     """Validate essential configuration."""
@@ -1,11 +1,14 @@
 """Context management for the agentic research tool."""
 
-from dataclasses import dataclass
-from typing import Optional, Any, Dict
-import json
-import os
+from dataclasses import dataclass, field
+from typing import Optional, Any, Dict, List
+import asyncio
+import orjson
 from datetime import datetime
-from config import RESULTS_DIR
+from config import (
+    RESEARCH_RESULTS_PATH, RESEARCH_RESULTS_JSON_PATH, CRITIQUE_RESULTS_PATH, FINAL_REPORT_PATH,
+    ensure_results_dir
+)
 from token_tracker import get_global_tracker
 
 
@@ -13,7 +16,27 @@ def _create_file_header(title: str, query: str) -> str:
     """Create standardized file header."""
     return f"{title}: {query}\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n{'=' * 50}\n\n"
 
-@dataclass
+def write_json(path: str, data: Any):
+    """Serialize data as indented UTF-8 JSON and write it in a single call."""
+    ensure_results_dir()
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+def write_text(path: str, text: str):
+    """Write text as UTF-8 in a single call."""
+    ensure_results_dir()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def _read_json_file(path: str) -> Optional[Dict[str, Any]]:
+    """Read a JSON file, returning None if it does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+@dataclass(slots=True)
 class ResearchContext:
     """Context object passed to all agents and tools."""
     
@@ -22,11 +45,63 @@ class ResearchContext:
     critique_requested: bool = False
     critique_only: bool = False
     input_file: Optional[str] = None
-    output_data: Dict[str, Any] = None
+    service_tier: Optional[str] = None
+    save_raw_events: bool = False
+    output_data: Dict[str, Any] = field(default_factory=dict)
+    
+    # Internal state, not part of the constructor or repr
+    _tracker: Any = field(default_factory=get_global_tracker, init=False, repr=False)
+    _usage_report_cache: Optional[tuple] = field(default=None, init=False, repr=False)
+    # Last written research_results.json payload, kept so later saves don't re-read it
+    _json_data: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False)
+    # Result writes still in flight, and the latest queued write per path (keeps same-file writes ordered)
+    _pending_writes: List[asyncio.Task] = field(default_factory=list, init=False, repr=False)
+    _write_tails: Dict[str, asyncio.Task] = field(default_factory=dict, init=False, repr=False)
+    # Stream event processor shared by all workflow phases (set up by the workflow runner)
+    event_processor: Any = field(default=None, init=False, repr=False)
+    
+    def _usage_report(self) -> Dict[str, Any]:
+        """Get the token usage report, rebuilt only when new usage was tracked."""
+        version = self._tracker.version
+        if self._usage_report_cache is None or self._usage_report_cache[0] != version:
+            self._usage_report_cache = (version, self._tracker.get_usage_report())
+        return self._usage_report_cache[1]
     
-    def __post_init__(self):
-        if self.output_data is None:
-            self.output_data = {}
+    def _queue_write(self, path: str, func, *args):
+        """Run a file write in a worker thread without waiting for it; writes to the same path stay in order."""
+        previous = self._write_tails.get(path)
+        task = asyncio.create_task(self._write_after(previous, func, *args))
+        self._write_tails[path] = task
+        self._pending_writes.append(task)
+    
+    @staticmethod
+    async def _write_after(previous: Optional[asyncio.Task], func, *args):
+        """Wait for the previous write to the same path (whatever its outcome), then write."""
+        if previous is not None:
+            await asyncio.wait([previous])
+        await asyncio.to_thread(func, *args)
+    
+    async def flush_pending_writes(self) -> List[BaseException]:
+        """Wait for all queued writes to finish; returns the errors of any that failed."""
+        pending, self._pending_writes = self._pending_writes, []
+        self._write_tails.clear()
+        outcomes = await asyncio.gather(*pending, return_exceptions=True)
+        return [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    
+    def _update_json_data(self, json_path: str, updates: Dict[str, Any], replace: bool = False):
+        """
+        Apply updates to the results JSON and write it; runs in a worker thread, ordered per path.
+        
+        Loaded from disk once if this run didn't write it; nothing is written if no file exists.
+        """
+        if replace:
+            self._json_data = {}
+        elif self._json_data is None:
+            self._json_data = _read_json_file(json_path)
+            if self._json_data is None:
+                return
+        self._json_data.update(updates)
+        write_json(json_path, self._json_data)
     
     def save_research_results(self, content: str, reasoning: str = "", 
                             tools_used: list = None, web_searches: list = None):
@@ -37,19 +112,17 @@ class ResearchContext:
             web_searches = []
             
         # Get token usage statistics
-        tracker = get_global_tracker()
+        tracker = self._tracker
         token_stats = tracker.format_markdown_section()
         
         # Combine research content with token usage statistics
         content_with_stats = f"{content}\n\n{token_stats}"
             
-        # Save text results
-        txt_path = os.path.join(RESULTS_DIR, "research_results.txt")
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write(_create_file_header("Research Query", self.query))
-            f.write(content_with_stats)
+        # Text results
+        txt_path = RESEARCH_RESULTS_PATH
+        txt_data = _create_file_header("Research Query", self.query) + content_with_stats
             
-        # Save JSON results
+        # JSON results
         json_data = {
             "query": self.query,
             "timestamp": datetime.now().isoformat(),
@@ -57,45 +130,44 @@ class ResearchContext:
             "reasoning": reasoning,
             "tools_used": tools_used,
             "web_searches": web_searches,
-            "token_usage": tracker.get_usage_report()
+            "token_usage": self._usage_report()
         }
         
-        json_path = os.path.join(RESULTS_DIR, "research_results.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2, ensure_ascii=False)
-            
+        json_path = RESEARCH_RESULTS_JSON_PATH
         self.output_data.update(json_data)
         
+        # Write both files off the event loop; flush_pending_writes() waits for them
+        self._queue_write(txt_path, write_text, txt_path, txt_data)
+        self._queue_write(json_path, self._update_json_data, json_path, json_data, True)
+        
         if self.verbose:
             print(f"Results saved to {txt_path} and {json_path}")
     
     def save_critique_results(self, critique: str):
         """Save critique results to file with token usage statistics."""
         # Get token usage statistics
-        tracker = get_global_tracker()
+        tracker = self._tracker
         token_stats = tracker.format_markdown_section()
         
         # Combine critique with token usage statistics
         critique_with_stats = f"{critique}\n\n{token_stats}"
         
-        critique_path = os.path.join(RESULTS_DIR, "critique_results.txt")
-        with open(critique_path, 'w', encoding='utf-8') as f:
-            f.write(_create_file_header("Critique for Query", self.query))
-            f.write(critique_with_stats)
+        critique_path = CRITIQUE_RESULTS_PATH
+        txt_data = _create_file_header("Critique for Query", self.query) + critique_with_stats
             
         # Update JSON with critique (including token stats)
-        json_path = os.path.join(RESULTS_DIR, "research_results.json")
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            data["critique"] = critique_with_stats
-            data["critique_timestamp"] = datetime.now().isoformat()
-            data["token_usage"] = tracker.get_usage_report()
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+        json_path = RESEARCH_RESULTS_JSON_PATH
+        json_updates = {
+            "critique": critique_with_stats,
+            "critique_timestamp": datetime.now().isoformat(),
+            "token_usage": self._usage_report()
+        }
                 
         self.output_data["critique"] = critique_with_stats
-        self.output_data["token_usage"] = tracker.get_usage_report()
+        self.output_data["token_usage"] = json_updates["token_usage"]
+        
+        self._queue_write(critique_path, write_text, critique_path, txt_data)
+        self._queue_write(json_path, self._update_json_data, json_path, json_updates)
         
         if self.verbose:
             print(f"Critique saved to {critique_path}")
@@ -103,51 +175,57 @@ class ResearchContext:
     def save_final_report_results(self, final_report: str):
         """Save final report results to file with token usage statistics."""
         # Get token usage statistics
-        tracker = get_global_tracker()
+        tracker = self._tracker
         token_stats = tracker.format_markdown_section(final_report=True)
         
         # Combine final report with token usage statistics
         final_report_with_stats = f"{final_report}\n\n{token_stats}"
         
-        final_report_path = os.path.join(RESULTS_DIR, "final_report.md")
-        with open(final_report_path, 'w', encoding='utf-8') as f:
-            f.write(f"# Final Research Report\n\n")
-            f.write(f"**Original Query:** {self.query}\n\n")
-            f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("---\n\n")
-            f.write(final_report_with_stats)
+        final_report_path = FINAL_REPORT_PATH
+        md_data = (
+            f"# Final Research Report\n\n"
+            f"**Original Query:** {self.query}\n\n"
+            f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+            "---\n\n"
+            f"{final_report_with_stats}"
+        )
             
         # Update JSON with final report (including token stats)
-        json_path = os.path.join(RESULTS_DIR, "research_results.json")
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            data["final_report"] = final_report_with_stats
-            data["final_report_timestamp"] = datetime.now().isoformat()
-            data["token_usage"] = tracker.get_usage_report()  # Update with latest stats
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+        json_path = RESEARCH_RESULTS_JSON_PATH
+        json_updates = {
+            "final_report": final_report_with_stats,
+            "final_report_timestamp": datetime.now().isoformat(),
+            "token_usage": self._usage_report()  # Update with latest stats
+        }
                 
         self.output_data["final_report"] = final_report_with_stats
-        self.output_data["token_usage"] = tracker.get_usage_report()
+        self.output_data["token_usage"] = json_updates["token_usage"]
+        
+        self._queue_write(final_report_path, write_text, final_report_path, md_data)
+        self._queue_write(json_path, self._update_json_data, json_path, json_updates)
         
         if self.verbose:
             print(f"Final report saved to {final_report_path}")
     
+    def load_saved_usage_by_model(self) -> Dict[str, Dict[str, int]]:
+        """Per-model token totals saved with the previous results (empty if unavailable)."""
+        data = _read_json_file(RESEARCH_RESULTS_JSON_PATH) or {}
+        return data.get("token_usage", {}).get("by_model", {})
+    
     def load_research_content(self, file_path: str) -> str:
         """Load research content from file."""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Input file not found: {file_path}")
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Input file not found: {file_path}") from None
             
         # If it's a JSON file, extract the content field
         if file_path.endswith('.json'):
             try:
-                data = json.loads(content)
+                data = orjson.loads(content)
                 return data.get('content', content)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 pass
                 
         return content
@@ -1,9 +1,10 @@
 """Centralized event processing for streaming workflows."""
 
-import json
 import os
-from typing import Dict, Any, Optional
-from config import RESULTS_DIR, MODEL_RESEARCH, MODEL_CRITIQUE, MODEL_FINAL_REPORT
+import sys
+import orjson
+from typing import Callable, Dict, Any, Optional
+from config import MODEL_RESEARCH, MODEL_CRITIQUE, MODEL_FINAL_REPORT, ensure_results_dir
 from context import ResearchContext
 from token_tracker import get_global_tracker, track_usage
 
@@ -22,26 +23,53 @@ class StreamEventProcessor:
     }
     
     WORKFLOW_TO_FILENAME = {
-        "research": "raw_events_research.json", 
-        "critique": "raw_events_critique_after_research.json",
-        "critique_only": "raw_events_critique.json",
-        "final_report": "raw_events_final_report.json",
-        "final_report_only": "raw_events_final_report_only.json",
-        "research_critique_iterative": "raw_events_iterative.json"
+        "research": "raw_events_research.jsonl", 
+        "critique": "raw_events_critique_after_research.jsonl",
+        "critique_only": "raw_events_critique.jsonl",
+        "final_report": "raw_events_final_report.jsonl",
+        "final_report_only": "raw_events_final_report_only.jsonl",
+        "research_critique_iterative": "raw_events_iterative.jsonl"
     }
     
-    def __init__(self, context: ResearchContext, workflow_type: str):
+    def __init__(self, context: ResearchContext, workflow_type: Optional[str] = None):
         self.context = context
         self.workflow_type = workflow_type
-        self.raw_events = []
+        # Raw events are only written when someone will read them
+        self._capture_raw = context.verbose or context.save_raw_events
+        self._raw_fp = None
+        self._raw_events_path = None
+        self._progress_buf = []
+        
+        # Dispatch tables for response items and tool call display, keyed once per processor
+        self._response_item_handlers = {
+            ("reasoning", "response.output_item.added"): self._display_reasoning_start,
+            ("reasoning", "response.output_item.done"): self._display_reasoning_done,
+            ("code_interpreter_call", "response.output_item.done"): self._display_code_interpreter_call,
+            ("function_call", "response.output_item.done"): self._display_tool_call,
+        }
+        self._tool_call_formatters = {
+            "verify_url": self._format_verify_url_call,
+            "verify_urls": self._format_verify_urls_call,
+            # MCP DeepWiki tools
+            "read_wiki_structure": self._format_mcp_call,
+            "read_wiki_contents": self._format_mcp_call,
+            "ask_question": self._format_mcp_call,
+            "ask_questions_batch": self._format_mcp_call,
+        }
+    
+    def set_workflow_type(self, workflow_type: str):
+        """Switch the workflow this processor attributes the next stream to."""
+        self.workflow_type = workflow_type
     
-    async def process_stream(self, result_stream, display_prefix: str = ""):
+    async def process_stream(self, result_stream, display_prefix: str = "",
+                             sink: Optional[Callable[[str], None]] = None):
         """
         Process entire event stream and return final output.
         
         Args:
             result_stream: The streaming result from Runner.run_streamed()
             display_prefix: Prefix for displayed events (e.g., "Research", "Critique")
+            sink: Optional callable receiving each output text delta as it streams
             
         Returns:
             Final output from the stream
@@ -49,88 +77,99 @@ class StreamEventProcessor:
         if self.context.verbose and display_prefix:
             print(f"\n{display_prefix} streaming events:")
         
-        async for ev in result_stream.stream_events():
-            self._save_raw_event(ev)
-            self._display_event(ev)
+        self._open_raw_events_file()
+        try:
+            async for ev in result_stream.stream_events():
+                self._save_raw_event(ev)
+                if sink is not None:
+                    self._forward_text_delta(ev, sink)
+                self._display_event(ev)
+            self._flush_progress()
+        finally:
+            # Keep whatever was streamed, even if the stream failed
+            self._close_raw_events_file()
         
         final_output = result_stream.final_output
         self._display_token_usage(result_stream)
-        self._save_raw_events_file()
         
         return final_output
     
+    @staticmethod
+    def _forward_text_delta(ev, sink: Callable[[str], None]):
+        """Pass output text deltas to the sink."""
+        if ev.type == "raw_response_event" and getattr(ev.data, "type", None) == "response.output_text.delta":
+            sink(ev.data.delta)
+    
     def _is_ping_event(self, ev) -> bool:
         """Check if event is a ping event that should be filtered out."""
-        return (hasattr(ev, 'type') and ev.type == 'ping') or 'ping' in str(ev).lower()
+        return getattr(ev, 'type', None) == 'ping'
     
     def _save_raw_event(self, ev):
-        """Save raw event for debugging."""
-        if self._is_ping_event(ev):
+        """Append raw event to the JSONL debug file as one line."""
+        if self._raw_fp is None or self._is_ping_event(ev):
             return
-            
+        self._raw_fp.write(orjson.dumps(self._serialize_event(ev), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE))
+    
+    @staticmethod
+    def _serialize_event(ev) -> Dict[str, Any]:
+        """Convert a raw event into a JSON-serializable dict."""
         try:
             if hasattr(ev, 'model_dump'):
-                self.raw_events.append(ev.model_dump())
-            else:
-                self.raw_events.append({
-                    "type": str(type(ev).__name__),
-                    "str_repr": str(ev),
-                    "event_type": getattr(ev, 'type', 'unknown')
-                })
+                return ev.model_dump()
+            return {
+                "type": str(type(ev).__name__),
+                "str_repr": str(ev),
+                "event_type": getattr(ev, 'type', 'unknown')
+            }
         except Exception as e:
-            self.raw_events.append({
+            return {
                 "error": f"Failed to serialize event: {e}", 
                 "type": str(type(ev).__name__)
-            })
+            }
     
     def _display_event(self, ev):
         """Display event based on type and verbose settings."""
         if not self.context.verbose or self._is_ping_event(ev):
             return
             
+        if ev.type == "tool_call_delta_event":
+            self._display_tool_progress(ev)
+            return
+        
+        # Any other displayed event ends the current run of progress ticks
+        self._flush_progress()
         if ev.type == "agent_updated_stream_event":
             print(f"\n🔄 Handoff to: {ev.new_agent.name}")
         elif ev.type == "raw_response_event":
             self._display_response_event(ev)
-        elif ev.type == "tool_call_delta_event":
-            self._display_tool_progress(ev)
-    
-    def _get_item_type(self, ev) -> str:
-        """Safely get the item type from an event."""
-        if not hasattr(ev.data, "item") or not hasattr(ev.data.item, "type"):
-            return ""
-        return ev.data.item.type
-    
-    def _is_search_event(self, ev) -> bool:
-        """Check if event is a web search event."""
-        return (hasattr(ev.data, "item") and 
-                hasattr(ev.data.item, "action") and 
-                hasattr(ev.data.item.action, "type") and 
-                ev.data.item.action.type == "search")
     
     def _display_response_event(self, ev):
         """Handle response events (web search, reasoning, tool calls)."""
-        item_type = self._get_item_type(ev)
-        event_type = getattr(ev.data, "type", "")
+        # Single walk of ev.data.item; missing attributes resolve to None/"" (e.g. delta events)
+        item = getattr(ev.data, "item", None)
+        action = getattr(item, "action", None)
         
-        if self._is_search_event(ev):
-            query = getattr(ev.data.item.action, 'query', 'Unknown query')
+        if getattr(action, "type", None) == "search":
+            query = getattr(action, 'query', 'Unknown query')
             if query is not None:
                 context_label = "Fact-checking" if self.workflow_type == "critique" else "Web search"
                 print(f"🔍 [{context_label}] {query}")
+            return
         
-        elif item_type == "reasoning":
-            if event_type == "response.output_item.added":
-                print("💭 [REASONING] ", end="", flush=True)
-            elif event_type == "response.output_item.done":
-                print("✓ ", end="", flush=True)
-                self._display_reasoning_summary(ev.data.item)
-        
-        elif item_type == "code_interpreter_call" and event_type == "response.output_item.done":
-            self._display_code_interpreter_call(ev.data.item)
-        
-        elif item_type == "function_call" and event_type == "response.output_item.done":
-            self._display_tool_call(ev.data.item)
+        item_type = getattr(item, "type", "")
+        event_type = getattr(ev.data, "type", "")
+        handler = self._response_item_handlers.get((item_type, event_type))
+        if handler:
+            handler(item)
+    
+    def _display_reasoning_start(self, reasoning_item):
+        """Mark the start of a reasoning item."""
+        print("💭 [REASONING] ", end="", flush=True)
+    
+    def _display_reasoning_done(self, reasoning_item):
+        """Mark the end of a reasoning item and show its summary."""
+        print("✓ ", end="", flush=True)
+        self._display_reasoning_summary(reasoning_item)
     
     def _display_reasoning_summary(self, reasoning_item):
         """Display reasoning summary if available."""
@@ -159,37 +198,68 @@ class StreamEventProcessor:
         """Display completed tool calls."""
         if hasattr(tool_item, 'name') and hasattr(tool_item, 'arguments'):
             args_text = tool_item.arguments
-            
-            # Special handling for different tool types
-            if tool_item.name == "verify_url":
-                try:
-                    args_dict = json.loads(args_text)
-                    url = args_dict.get('url', 'unknown URL')
-                    print(f"\n🔧 [Tool] {tool_item.name}({url})")
-                except Exception:
-                    print(f"\n🔧 [Tool] {tool_item.name}({args_text})")
-            elif tool_item.name in ["read_wiki_structure", "read_wiki_contents", "ask_question"]:
-                # MCP DeepWiki tools
-                try:
-                    args_dict = json.loads(args_text)
-                    repo = args_dict.get('repoName', 'unknown repo')
-                    if tool_item.name == "ask_question":
-                        question = args_dict.get('question', 'unknown question')
-                        print(f"\n📚 [MCP] {tool_item.name}({repo}: '{question}')")
-                    else:
-                        print(f"\n📚 [MCP] {tool_item.name}({repo})")
-                except Exception:
-                    print(f"\n📚 [MCP] {tool_item.name}({args_text})")
-            else:
+            formatter = self._tool_call_formatters.get(tool_item.name)
+            if formatter is None:
                 print(f"\n🔧 [Tool] {tool_item.name}({args_text})")
+                return
+            
+            # Parse arguments once, only for tools whose display needs individual fields
+            try:
+                args_dict = orjson.loads(args_text)
+            except orjson.JSONDecodeError:
+                args_dict = None
+            if not isinstance(args_dict, dict):
+                args_dict = None
+            print(f"\n{formatter(tool_item.name, args_dict, args_text)}")
+    
+    @staticmethod
+    def _format_verify_url_call(name: str, args_dict: Optional[Dict[str, Any]], args_text: str) -> str:
+        """Format a verify_url call showing only the URL."""
+        if args_dict is None:
+            return f"🔧 [Tool] {name}({args_text})"
+        return f"🔧 [Tool] {name}({args_dict.get('url', 'unknown URL')})"
+    
+    @staticmethod
+    def _format_verify_urls_call(name: str, args_dict: Optional[Dict[str, Any]], args_text: str) -> str:
+        """Format a verify_urls call showing the number of URLs."""
+        urls = args_dict.get('urls') if args_dict is not None else None
+        if not isinstance(urls, list):
+            return f"🔧 [Tool] {name}({args_text})"
+        return f"🔧 [Tool] {name}({len(urls)} URLs)"
+    
+    @staticmethod
+    def _format_mcp_call(name: str, args_dict: Optional[Dict[str, Any]], args_text: str) -> str:
+        """Format a DeepWiki MCP call showing the repository (and question)."""
+        if args_dict is None:
+            return f"📚 [MCP] {name}({args_text})"
+        repo = args_dict.get('repoName', 'unknown repo')
+        if name == "ask_question":
+            question = args_dict.get('question', 'unknown question')
+            return f"📚 [MCP] {name}({repo}: '{question}')"
+        if name == "ask_questions_batch":
+            questions = args_dict.get('questions')
+            count = len(questions) if isinstance(questions, list) else 0
+            return f"📚 [MCP] {name}({repo}: {count} questions)"
+        return f"📚 [MCP] {name}({repo})"
+    
+    PROGRESS_TICKS = {"web_search": ".", "verify_url": "🔧", "verify_urls": "🔧"}
+    PROGRESS_FLUSH_EVERY = 16
     
     def _display_tool_progress(self, ev):
-        """Show tool usage progress indicators."""
+        """Buffer tool usage progress indicators, writing them out in batches."""
         if hasattr(ev, 'tool_call') and hasattr(ev.tool_call, 'function'):
-            if ev.tool_call.function.name == "web_search":
-                print(".", end="", flush=True)
-            elif ev.tool_call.function.name == "verify_url":
-                print("🔧", end="", flush=True)
+            tick = self.PROGRESS_TICKS.get(ev.tool_call.function.name)
+            if tick:
+                self._progress_buf.append(tick)
+                if len(self._progress_buf) >= self.PROGRESS_FLUSH_EVERY:
+                    self._flush_progress()
+    
+    def _flush_progress(self):
+        """Write buffered progress ticks with a single write and flush."""
+        if self._progress_buf:
+            sys.stdout.write(''.join(self._progress_buf))
+            sys.stdout.flush()
+            self._progress_buf.clear()
     
     def _display_token_usage(self, result_stream):
         """Display token usage information and track it."""
@@ -234,18 +304,24 @@ class StreamEventProcessor:
         """Get the model name based on workflow type."""
         return self.WORKFLOW_TO_MODEL.get(self.workflow_type, "unknown")
     
-    def _save_raw_events_file(self):
-        """Save raw events to workflow-specific file."""
-        filename = self.WORKFLOW_TO_FILENAME.get(self.workflow_type, f"raw_events_{self.workflow_type}.json")
-        raw_events_path = os.path.join(RESULTS_DIR, filename)
-        
-        with open(raw_events_path, 'w', encoding='utf-8') as f:
-            json.dump(self.raw_events, f, indent=2, ensure_ascii=False)
+    def _open_raw_events_file(self):
+        """Open the workflow-specific raw events file for incremental JSONL writes."""
+        if not self._capture_raw:
+            return
+        filename = self.WORKFLOW_TO_FILENAME.get(self.workflow_type, f"raw_events_{self.workflow_type}.jsonl")
+        self._raw_events_path = os.path.join(ensure_results_dir(), filename)
+        self._raw_fp = open(self._raw_events_path, 'wb')
+    
+    def _close_raw_events_file(self):
+        """Close the raw events file once the stream ends."""
+        if self._raw_fp is None:
+            return
+        self._raw_fp.close()
+        self._raw_fp = None
         
         if self.context.verbose:
-            print(f"Raw {self.workflow_type} events saved to {raw_events_path}")
-
+            print(f"Raw {self.workflow_type} events saved to {self._raw_events_path}")
 
-def create_event_processor(context: ResearchContext, workflow_type: str) -> StreamEventProcessor:
+def create_event_processor(context: ResearchContext, workflow_type: Optional[str] = None) -> StreamEventProcessor:
     """Factory function to create event processor."""
     return StreamEventProcessor(context, workflow_type)
\ No newline at end of file
@@ -1,36 +1,108 @@
 """Main entry point for the agentic research tool."""
 
 import asyncio
+import contextlib
 import sys
-import os
 import json
 import logging
-from typing import Optional
+import logging.config
+import re
+from typing import List, Optional
 
-# Configure logging to suppress SSE ping messages
-logging.basicConfig(level=logging.WARNING)
-# Suppress specific loggers that might be printing SSE ping messages
-logging.getLogger('agents').setLevel(logging.ERROR)
-logging.getLogger('agents.mcp').setLevel(logging.ERROR)
-logging.getLogger('mcp.client.sse').setLevel(logging.ERROR)  # This suppresses the ping warnings
-logging.getLogger('httpx').setLevel(logging.WARNING)
+try:
+    import uvloop  # Optional: faster event loop for the many small awaits per streamed chunk
+except ImportError:
+    uvloop = None
 
+# Configure logging to suppress SSE ping messages (same output as basicConfig at WARNING)
+_LOG_CONFIG = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"basic": {"format": logging.BASIC_FORMAT}},
+    "handlers": {"stderr": {"class": "logging.StreamHandler", "formatter": "basic"}},
+    "root": {"level": "WARNING", "handlers": ["stderr"]},
+    # Suppress specific loggers that might be printing SSE ping messages
+    "loggers": {
+        "agents": {"level": "ERROR"},
+        "agents.mcp": {"level": "ERROR"},
+        "mcp.client.sse": {"level": "ERROR"},  # This suppresses the ping warnings
+        "httpx": {"level": "WARNING"},
+    },
+}
+logging.config.dictConfig(_LOG_CONFIG)
 
-from agents import Runner
+
+from agents import Runner, set_default_openai_client
 from cli import (
     create_parser, validate_args, get_effective_query,
     display_welcome, display_error, display_success, display_info, display_warning,
-    display_critique_mode, display_research_mode
+    display_critique_mode, display_research_mode, display_final_report_mode, display_output
 )
 from config import (
     MODEL_RESEARCH, MODEL_CRITIQUE, RESULTS_DIR, MAX_TURNS_RESEARCH, MAX_TURNS_CRITIQUE, MAX_TURNS_FINAL_REPORT,
+    SERVICE_TIER_FLEX, RESEARCH_RESULTS_PATH, CRITIQUE_RESULTS_PATH, TOKEN_USAGE_PATH,
     EXIT_SUCCESS, EXIT_VALIDATION_ERROR, EXIT_RESEARCH_AGENT_ERROR, EXIT_CRITIQUE_AGENT_ERROR, 
-    EXIT_FINAL_REPORT_AGENT_ERROR, EXIT_GENERAL_ERROR
+    EXIT_FINAL_REPORT_AGENT_ERROR, EXIT_GENERAL_ERROR, get_async_client, ensure_results_dir
 )
 from context import ResearchContext
 from research_agents import ResearchAgents
-from token_tracker import get_global_tracker, reset_global_tracker
+from token_tracker import get_global_tracker, reset_global_tracker, format_cost_table
 from event_processor import create_event_processor
+from tools import close_http_client
+
+# Errors whose message mentions the stream or connection are reported as streaming failures
+_STREAM_CONN_RE = re.compile(r"stream|connection", re.IGNORECASE)
+
+# Exit code for each failed_agent value
+_EXIT_CODES = {
+    "research": EXIT_RESEARCH_AGENT_ERROR,
+    "critique": EXIT_CRITIQUE_AGENT_ERROR,
+    "final_report": EXIT_FINAL_REPORT_AGENT_ERROR,
+    "general": EXIT_GENERAL_ERROR,
+}
+
+_FINAL_REPORT_HEADER = "\n" + "="*60 + "\nFINAL REPORT:\n" + "="*60 + "\n"
+
+class AgentRunError(Exception):
+    """An agent run failed; `agent` names the failing agent for exit code selection."""
+    
+    def __init__(self, agent: str, error: BaseException):
+        super().__init__(str(error))
+        self.agent = agent
+
+@contextlib.contextmanager
+def _agent_setup(agent: str):
+    """Tag failures in an agent's setup (MCP connect, input loading) with the agent name, like _stream_agent does."""
+    try:
+        yield
+    except Exception as e:
+        raise AgentRunError(agent, e) from e
+
+def _get_processor(context: ResearchContext, workflow_type: str):
+    """Get the workflow's shared event processor, set up for workflow_type."""
+    processor = context.event_processor
+    processor.set_workflow_type(workflow_type)
+    return processor
+
+async def _stream_agent(context: ResearchContext, agent: str, workflow_type: str, result_stream,
+                        display_prefix: str = "", sink=None):
+    """
+    Process an agent's event stream as a task of its own and return the final output.
+    
+    If the stream fails or the workflow is cancelled (e.g. Ctrl+C), the underlying
+    run is cancelled as well so no request outlives it; failures are raised as
+    AgentRunError tagged with the agent name.
+    """
+    processor = _get_processor(context, workflow_type)
+    try:
+        async with asyncio.TaskGroup() as tg:
+            stream_task = tg.create_task(processor.process_stream(result_stream, display_prefix, sink))
+    except BaseException as e:
+        result_stream.cancel()
+        if isinstance(e, ExceptionGroup):
+            raise AgentRunError(agent, e.exceptions[0]) from e.exceptions[0]
+        raise
+    return stream_task.result()
 
 async def run_research_workflow(args) -> dict:
     """
@@ -50,6 +122,12 @@ async def run_research_workflow(args) -> dict:
     # Reset token tracker for new workflow
     reset_global_tracker()
     
+    # Results directory is only needed once a workflow actually runs
+    ensure_results_dir()
+    
+    # Reuse one OpenAI client (and its connection pool) across all workflow phases
+    set_default_openai_client(get_async_client())
+    
     # Create research context
     query = get_effective_query(args)
     context = ResearchContext(
@@ -57,10 +135,15 @@ async def run_research_workflow(args) -> dict:
         verbose=args.verbose,
         critique_requested=args.critique,
         critique_only=args.critique_only,
-        input_file=args.input_file
+        input_file=args.input_file,
+        service_tier=SERVICE_TIER_FLEX if args.flex else None,
+        save_raw_events=args.save_raw_events
     )
+    # One event processor for the whole workflow; each phase switches its workflow type
+    context.event_processor = create_event_processor(context)
     
-    results = {}
+    # Phases record their outputs in context.output_data; results shares that dict
+    results = context.output_data
     
     # Track which agent failed for specific error codes
     failed_agent = None
@@ -68,34 +151,45 @@ async def run_research_workflow(args) -> dict:
     try:
         if args.iterative and args.critique and not args.final_report_only and not args.critique_only:
             # Use iterative handoff workflow when explicitly enabled
-            failed_agent = await run_iterative_workflow(context, args, results)
+            await run_iterative_workflow(context, args, results)
         else:
             # Use standalone workflow by default
-            failed_agent = await run_standalone_workflow(context, args, results)
+            await run_standalone_workflow(context, args, results)
             
     except KeyboardInterrupt:
         display_error("Workflow interrupted by user (Ctrl+C)")
         results["error"] = "User interruption"
     except Exception as e:
         error_msg = str(e)
-        if "stream" in error_msg.lower() or "connection" in error_msg.lower():
+        if _STREAM_CONN_RE.search(error_msg):
             display_error(f"Streaming connection failed: {error_msg}")
             results["error"] = f"Streaming failure: {error_msg}"
         else:
             display_error(f"Workflow execution failed: {error_msg}")
             results["error"] = error_msg
+        failed_agent = getattr(e, "agent", "general")
+    finally:
+        # Result files are written in the background; make sure they land, even if a later phase failed
+        save_errors = await context.flush_pending_writes()
+    
+    if save_errors and "error" not in results:
+        display_error(f"Failed to save results: {save_errors[0]}")
+        results["error"] = f"Save failure: {save_errors[0]}"
         failed_agent = "general"
     
-    # Add token usage to results
+    # Add the full token usage report to results when it will be looked at (the saved files
+    # already carry it); otherwise drop the per-phase copy the save_*_results calls left there
     tracker = get_global_tracker()
-    results["token_usage"] = tracker.get_usage_report()
+    if tracker.has_records() and (args.verbose or "error" in results):
+        results["token_usage"] = tracker.get_usage_report()
+    else:
+        results.pop("token_usage", None)
     
     # Save token usage report
-    token_usage_path = os.path.join(RESULTS_DIR, "token_usage.json")
-    tracker.save_to_file(token_usage_path)
+    await asyncio.to_thread(tracker.save_to_file, TOKEN_USAGE_PATH)
     
-    # Display token usage summary
-    if args.verbose:
+    # Display token usage summary (nothing to show if no tokens were consumed)
+    if args.verbose and tracker.total_tokens > 0:
         tracker.print_summary()
     
     # Add failed agent info to results for error code determination
@@ -107,28 +201,20 @@ async def run_research_workflow(args) -> dict:
 
 async def run_iterative_workflow(context: ResearchContext, args, results: dict):
     """Run iterative research-critique workflow with hybrid handoffs."""
-    failed_agent = None
-    from agents import Runner
-    
     display_info("🔄 Iterative Research-Critique Workflow (Hybrid)")
     print("--------------------")
     print("Using hybrid approach: programmatic research→critique, OpenAI critique→research")
     
     # Create regular research agent (no MCP)
-    research_agent = ResearchAgents.create_research_agent()
+    research_agent = ResearchAgents.get_research_agent()
     
     if context.verbose:
         display_info(f"Starting iterative workflow: {context.query}")
         print(f"\n🔍 Beginning research...")
     
     # Step 1: Run initial research programmatically
-    try:
-        result_stream = Runner.run_streamed(research_agent, context.query, context=context, max_turns=MAX_TURNS_RESEARCH)
-        processor = create_event_processor(context, "research")
-        research_content = await processor.process_stream(result_stream, "🔍 Research")
-    except Exception as e:
-        failed_agent = "research"
-        raise e
+    result_stream = Runner.run_streamed(research_agent, context.query, context=context, max_turns=MAX_TURNS_RESEARCH)
+    research_content = await _stream_agent(context, "research", "research", result_stream, "🔍 Research")
     
     if context.verbose:
         print("\n")
@@ -136,155 +222,128 @@ async def run_iterative_workflow(context: ResearchContext, args, results: dict):
     
     # Save initial research results
     context.save_research_results(research_content)
-    results.update(context.output_data)
     results["research_output"] = research_content
     
     if context.verbose:
         print(f"\n📝 Starting critique with handoff capability and MCP tools...")
     
     # Step 2: Create critique agent with MCP and handoff to research agent
-    critique_agent, mcp_server = await ResearchAgents.create_critique_agent_with_mcp(research_agent)
-    
-    try:
+    async with contextlib.AsyncExitStack() as stack:
+        with _agent_setup("critique"):
+            mcp_server = await stack.enter_async_context(ResearchAgents.mcp_server_context())
+            critique_agent, _ = await ResearchAgents.create_critique_agent_with_mcp(research_agent, context.service_tier, mcp_server)
+        
         # Create critique message with research content
         critique_message = ResearchAgents.create_critique_message(context.query, research_content)
         
         # Run critique with potential handoff back to research
-        try:
-            result_stream = Runner.run_streamed(
-                critique_agent, 
-                critique_message, 
-                context=context, 
-                max_turns=MAX_TURNS_CRITIQUE
-            )
-            processor = create_event_processor(context, "research_critique_iterative")
-            final_output = await processor.process_stream(result_stream, "📝 Critique")
-        except Exception as e:
-            failed_agent = "critique"
-            raise e
+        result_stream = Runner.run_streamed(
+            critique_agent, 
+            critique_message, 
+            context=context, 
+            max_turns=MAX_TURNS_CRITIQUE
+        )
+        final_output = await _stream_agent(context, "critique", "research_critique_iterative", result_stream, "📝 Critique")
         
         if context.verbose:
             print("\n")
             display_success("Iterative workflow completed")
         
-        # Print final output to screen
+        # Save critique results first: the files are written in the background
+        # while the output is printed and the final report starts
         if final_output:
-            print("\n" + "="*60)
-            print("FINAL OUTPUT:")
-            print("="*60)
-            print(final_output)
-            print("="*60 + "\n")
+            context.save_critique_results(final_output)
         
-        # Save critique results to context for final report
+        # Print final output to screen
         if final_output:
-            context.save_critique_results(final_output)
+            display_output("FINAL OUTPUT:", final_output)
         
         # Save final results
-        results.update(context.output_data)
         results["iterative_output"] = final_output
         
         # If final report is also requested, generate it using standalone approach
         if args.final_report:
-            print("\n" + "="*60)
-            display_info("📊 Final Report Mode")
-            print("="*60)
-            try:
-                await run_final_report(context, results)
-            except Exception as e:
-                failed_agent = "final_report"
-                raise e
-            
-    finally:
-        # Clean up MCP server
-        await mcp_server.cleanup()
-    
-    return failed_agent
+            display_final_report_mode()
+            # Hand over the in-memory research and critique (with stats) directly
+            output_data = context.output_data
+            await run_final_report(
+                context, results,
+                research_content=output_data.get("content", ""),
+                critique_content=output_data.get("critique", ""),
+                source_description="previous workflow steps"
+            )
 
 async def run_standalone_workflow(context: ResearchContext, args, results: dict):
     """Run workflow using standalone agents."""
-    failed_agent = None
-    
-    if args.final_report_only:
-        # Final-report-only mode
-        display_info("📊 Final Report Only Mode")
-        print("--------------------")
-        try:
-            await run_final_report(context, results, source_description="final-report-only")
-        except Exception as e:
-            failed_agent = "final_report"
-            raise e
-    elif args.critique_only:
-        # Critique-only mode
-        display_critique_mode()
-        try:
-            await run_critique(context, results)
-        except Exception as e:
-            failed_agent = "critique"
-            raise e
-    elif args.critique:
-        # Research + critique mode  
-        display_research_mode()
+    # First matching flag wins; research-only when none is set
+    run_mode = next((mode for flag, mode in _STANDALONE_MODES if getattr(args, flag)), run_research_only_mode)
+    await run_mode(context, args, results)
+
+async def run_final_report_only_mode(context: ResearchContext, args, results: dict):
+    """Final-report-only mode."""
+    display_info("📊 Final Report Only Mode")
+    print("--------------------")
+    await run_final_report(context, results, source_description="final-report-only")
+
+async def run_critique_only_mode(context: ResearchContext, args, results: dict):
+    """Critique-only mode."""
+    display_critique_mode()
+    await run_critique(context, results)
+
+async def run_research_critique_mode(context: ResearchContext, args, results: dict):
+    """Research + critique mode, optionally followed by the final report."""
+    display_research_mode()
+    # Research streams in a child task while this task connects the critique MCP server,
+    # which must also be cleaned up here (its SSE client is bound to the connecting task)
+    async with contextlib.AsyncExitStack() as stack:
+        research_task = asyncio.create_task(run_research(context, results))
         try:
-            await run_research(context, results)
+            mcp_server = await stack.enter_async_context(ResearchAgents.mcp_server_context())
         except Exception as e:
-            failed_agent = "research"
-            raise e
+            # Let research finish and save before reporting the MCP failure as a critique error
+            await research_task
+            raise AgentRunError("critique", e) from e
+        
+        research_content = await research_task
         
         display_critique_mode()
-        # Get research content from context and pass it to critique
-        research_content = context.output_data.get("content", "")
+        # Pass the research output straight to critique
         if not research_content:
             display_warning("No research content found for critique")
         else:
-            try:
-                await run_critique(context, results, research_content, "previous research")
-            except Exception as e:
-                failed_agent = "critique"
-                raise e
-            
-        # If final report is also requested, generate it
-        if args.final_report:
-            print("\n" + "="*60)
-            display_info("📊 Final Report Mode")
-            print("="*60)
-            try:
-                await run_final_report(context, results)
-            except Exception as e:
-                failed_agent = "final_report"
-                raise e
-    elif args.final_report:
-        # Research + final report mode (without critique)
-        display_research_mode()
-        try:
-            await run_research(context, results)
-        except Exception as e:
-            failed_agent = "research"
-            raise e
-        
-        print("\n" + "="*60)
-        display_info("📊 Final Report Mode")
-        print("="*60)
-        try:
-            await run_final_report(context, results)
-        except Exception as e:
-            failed_agent = "final_report"
-            raise e
-    else:
-        # Research-only mode
-        display_research_mode()
-        try:
-            await run_research(context, results)
-        except Exception as e:
-            failed_agent = "research"
-            raise e
+            await run_critique(context, results, research_content, "previous research", mcp_server)
     
-    return failed_agent
+    # If final report is also requested, generate it
+    if args.final_report:
+        display_final_report_mode()
+        await run_final_report(context, results)
 
-async def run_research(context: ResearchContext, results: dict):
-    """Run standalone research."""
+async def run_research_final_report_mode(context: ResearchContext, args, results: dict):
+    """Research + final report mode (without critique)."""
+    display_research_mode()
+    await run_research(context, results)
+    
+    display_final_report_mode()
+    await run_final_report(context, results)
+
+async def run_research_only_mode(context: ResearchContext, args, results: dict):
+    """Research-only mode."""
+    display_research_mode()
+    await run_research(context, results)
+
+# Standalone modes in precedence order, keyed by the CLI flag that selects them
+_STANDALONE_MODES = (
+    ("final_report_only", run_final_report_only_mode),
+    ("critique_only", run_critique_only_mode),
+    ("critique", run_research_critique_mode),
+    ("final_report", run_research_final_report_mode),
+)
+
+async def run_research(context: ResearchContext, results: dict) -> str:
+    """Run standalone research and return the research output."""
     
     # Create regular research agent (no MCP)
-    research_agent = ResearchAgents.create_research_agent()
+    research_agent = ResearchAgents.get_research_agent()
     
     if context.verbose:
         display_info(f"Starting research: {context.query}")
@@ -294,8 +353,7 @@ async def run_research(context: ResearchContext, results: dict):
     result_stream = Runner.run_streamed(research_agent, context.query, context=context, max_turns=MAX_TURNS_RESEARCH)
     
     # Process events through centralized processor
-    processor = create_event_processor(context, "research")
-    research_content = await processor.process_stream(result_stream)
+    research_content = await _stream_agent(context, "research", "research", result_stream)
     
     if context.verbose:
         print("\n")
@@ -304,20 +362,29 @@ async def run_research(context: ResearchContext, results: dict):
     # Save research results
     context.save_research_results(research_content)
     
-    results.update(context.output_data)
     results["research_output"] = research_content
+    return research_content
 
-async def run_critique(context: ResearchContext, results: dict, research_content: str = None, source_description: str = "research"):
-    """Run critique workflow on research content."""
+async def run_critique(context: ResearchContext, results: dict, research_content: str = None, source_description: str = "research",
+                       mcp_server=None):
+    """
+    Run critique workflow on research content.
     
-    # Create critique agent with MCP server
-    critique_agent, mcp_server = await ResearchAgents.create_critique_agent_with_mcp()
+    A connected MCP server may be passed in, in which case its lifetime belongs to the caller.
+    """
     
-    try:
-        # Get research content - either from parameter or load from file
-        if research_content is None:
-            research_content = context.load_research_content(context.input_file)
-            source_description = f"file: {context.input_file}"
+    async with contextlib.AsyncExitStack() as stack:
+        with _agent_setup("critique"):
+            if mcp_server is None:
+                mcp_server = await stack.enter_async_context(ResearchAgents.mcp_server_context())
+            
+            # Create critique agent on the connected MCP server
+            critique_agent, _ = await ResearchAgents.create_critique_agent_with_mcp(service_tier=context.service_tier, mcp_server=mcp_server)
+            
+            # Get research content - either from parameter or load from file
+            if research_content is None:
+                research_content = context.load_research_content(context.input_file)
+                source_description = f"file: {context.input_file}"
         
         critique_message = ResearchAgents.create_critique_message(context.query, research_content)
         
@@ -335,8 +402,7 @@ async def run_critique(context: ResearchContext, results: dict, research_content
         
         # Determine workflow type for event processor
         workflow_type = "critique_only" if "file:" in source_description else "critique"
-        processor = create_event_processor(context, workflow_type)
-        critique_content = await processor.process_stream(result_stream)
+        critique_content = await _stream_agent(context, "critique", workflow_type, result_stream)
         
         if context.verbose:
             print("\n")
@@ -345,32 +411,32 @@ async def run_critique(context: ResearchContext, results: dict, research_content
         # Save critique results
         context.save_critique_results(critique_content)
         
-        results.update(context.output_data)
         results["critique_output"] = critique_content
-        
-    finally:
-        # Clean up MCP server
-        await mcp_server.cleanup()
 
 
 async def run_final_report(context: ResearchContext, results: dict, research_content: str = None, critique_content: str = None, source_description: str = "workflow"):
     """Run final report generation using research and critique content."""
     
-    final_report_agent = ResearchAgents.create_final_report_agent()
+    final_report_agent = ResearchAgents.get_final_report_agent(context.service_tier)
     
     # Get research and critique content - either from parameters or load from files/context
     if research_content is None or critique_content is None:
         if source_description == "workflow":
             # Get from context (after research and critique steps)
-            research_content = context.output_data.get("content", "")
-            critique_content = context.output_data.get("critique", "")
+            output_data = context.output_data
+            research_content = output_data.get("content", "")
+            critique_content = output_data.get("critique", "")
             source_description = "previous workflow steps"
         else:
             # Load from files (final-report-only mode)
-            research_path = os.path.join(RESULTS_DIR, "research_results.txt")
-            critique_path = os.path.join(RESULTS_DIR, "critique_results.txt")
-            research_content = context.load_research_content(research_path)
-            critique_content = context.load_research_content(critique_path)
+            research_path = RESEARCH_RESULTS_PATH
+            critique_path = CRITIQUE_RESULTS_PATH
+            # Two independent reads: run them concurrently off the event loop
+            with _agent_setup("final_report"):
+                research_content, critique_content = await asyncio.gather(
+                    asyncio.to_thread(context.load_research_content, research_path),
+                    asyncio.to_thread(context.load_research_content, critique_path),
+                )
             source_description = f"files: {research_path} and {critique_path}"
     
     if not research_content:
@@ -381,7 +447,19 @@ async def run_final_report(context: ResearchContext, results: dict, research_con
         display_warning("No critique content found for final report")
         return
     
-    final_report_message = ResearchAgents.create_final_report_message(context.query, research_content, critique_content)
+    # Price research and critique usage in Python; the final report agent only copies the table
+    tracker = get_global_tracker()
+    if tracker.has_records():
+        usage_by_model = tracker.get_model_summary()
+    else:
+        # Final-report-only mode: this process has tracked nothing, use the saved results
+        with _agent_setup("final_report"):
+            usage_by_model = await asyncio.to_thread(context.load_saved_usage_by_model)
+    cost_table = format_cost_table(usage_by_model)
+    
+    final_report_message = ResearchAgents.create_final_report_message(
+        context.query, research_content, critique_content, cost_table
+    )
     
     if context.verbose:
         display_info(f"Starting final report generation from {source_description}")
@@ -395,16 +473,23 @@ async def run_final_report(context: ResearchContext, results: dict, research_con
     
     # Determine workflow type for event processor
     workflow_type = "final_report_only" if "files:" in source_description else "final_report"
-    processor = create_event_processor(context, workflow_type)
-    final_report_content = await processor.process_stream(result_stream)
     
-    # Print final report to screen
-    if final_report_content:
-        print("\n" + "="*60)
-        print("FINAL REPORT:")
-        print("="*60)
-        print(final_report_content)
-        print("="*60 + "\n")
+    # Print final report to screen as it is generated
+    report_started = False
+    def print_report_delta(delta: str):
+        nonlocal report_started
+        if not report_started:
+            report_started = True
+            sys.stdout.write(_FINAL_REPORT_HEADER)
+        sys.stdout.write(delta)
+    
+    final_report_content = await _stream_agent(context, "final_report", workflow_type, result_stream, sink=print_report_delta)
+    
+    if report_started:
+        sys.stdout.write("\n" + "="*60 + "\n\n")
+    elif final_report_content:
+        # No text deltas were streamed; show the final output instead
+        display_output("FINAL REPORT:", final_report_content)
     
     if context.verbose:
         print("\n")
@@ -413,16 +498,23 @@ async def run_final_report(context: ResearchContext, results: dict, research_con
     # Save final report results
     context.save_final_report_results(final_report_content)
     
-    results.update(context.output_data)
     results["final_report_output"] = final_report_content
 
 
 async def main():
     """Main entry point."""
+    return await run_cli()
+
+async def run_cli(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the tool for a command line and return its exit code.
     
-    # Parse arguments
-    parser = create_parser()
-    args = parser.parse_args()
+    Args:
+        argv: Command line arguments (defaults to sys.argv[1:])
+    """
+    
+    # Parse arguments with the parser built once at import
+    args = create_parser().parse_args(argv)
     
     # Display welcome
     display_welcome()
@@ -433,8 +525,13 @@ async def main():
         display_error(error_msg)
         return EXIT_VALIDATION_ERROR
     
-    # Run workflow
-    results = await run_research_workflow(args)
+    # Run workflow; the pooled MCP connection is closed from this task, which opened it,
+    # together with the URL-check HTTP client
+    try:
+        results = await run_research_workflow(args)
+    finally:
+        await ResearchAgents.close_mcp_server()
+        await close_http_client()
     
     # Display final results and return appropriate exit code
     if "error" not in results:
@@ -446,17 +543,13 @@ async def main():
         display_error(f"Workflow failed: {results['error']}")
         
         # Return specific error code based on which agent failed
-        failed_agent = results.get("failed_agent", "general")
-        if failed_agent == "research":
-            return EXIT_RESEARCH_AGENT_ERROR
-        elif failed_agent == "critique":
-            return EXIT_CRITIQUE_AGENT_ERROR
-        elif failed_agent == "final_report":
-            return EXIT_FINAL_REPORT_AGENT_ERROR
-        else:
-            return EXIT_GENERAL_ERROR
+        return _EXIT_CODES.get(results.get("failed_agent", "general"), EXIT_GENERAL_ERROR)
+
+def run_main() -> int:
+    """Run main() on uvloop when it is installed, otherwise on the default asyncio loop."""
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(main())
 
 if __name__ == "__main__":
-    import sys
-    exit_code = asyncio.run(main())
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(run_main())
\ No newline at end of file
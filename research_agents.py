@@ -1,26 +1,26 @@
 """Agent implementations for the agentic research system."""
 
-from agents import Agent, WebSearchTool, CodeInterpreterTool, ModelSettings
+import asyncio
+import orjson
+import re
+import weakref
+from agents import Agent, WebSearchTool, CodeInterpreterTool, ModelSettings, FunctionTool, function_tool, handoff
+from agents.extensions import handoff_filters
 from agents.mcp import MCPServerSse
-from openai.types.shared_params.reasoning import Reasoning
-from openai.types.responses.tool_param import CodeInterpreter
-from typing import List
-from config import MODEL_RESEARCH, MODEL_CRITIQUE, MODEL_FINAL_REPORT
-from tools import verify_url
-
-class ResearchAgents:
-    """Factory class for creating research agents and prompt templates."""
-    
-    @staticmethod
-    def _create_base_model_settings() -> ModelSettings:
-        """Create standardized model settings for all agents."""
-        return ModelSettings(reasoning=Reasoning(summary="auto"))
-    
-    @staticmethod
-    def create_research_agent() -> Agent:
-        """Create the main research agent."""
-        
-        research_instructions = """
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Final, List, Optional
+from config import MODEL_RESEARCH, MODEL_CRITIQUE, MODEL_FINAL_REPORT, ASK_QUESTIONS_MAX, FLEX_MODELS, SERVICE_TIER_FLEX
+from tools import verify_url, verify_urls, tool_rate_limiter, AsyncTTLCache
+
+if TYPE_CHECKING:
+    # TypedDicts: plain dicts at runtime, so only needed for type checking
+    from openai.types.responses.tool_param import CodeInterpreter
+    from openai.types.shared_params.reasoning import Reasoning
+
+# Agent instructions (immutable, built once at import). They lead every request unchanged,
+# so OpenAI's automatic prompt caching bills repeat turns at the cached-input rate.
+_RESEARCH_INSTRUCTIONS: Final[str] = """
 You are a professional researcher preparing a structured, data-driven report according to user query. 
 
 CONTEXT AWARENESS:
@@ -44,37 +44,20 @@ TOOL USAGE:
 
 Provide a comprehensive research report that directly addresses the user's query.
 """
-        
-        return Agent(
-            name="ResearchAgent",
-            instructions=research_instructions,
-            model=MODEL_RESEARCH,
-            model_settings=ResearchAgents._create_base_model_settings(),
-            tools=[
-                WebSearchTool(),
-                CodeInterpreterTool(tool_config=CodeInterpreter(
-                    type="code_interpreter",
-                    container={"type": "auto", "file_ids": []}
-                )),
-            ],
-            handoffs=[]
-        )
-    
-    
-    @staticmethod
-    def create_critique_agent(research_agent=None) -> Agent:
-        """Create the critique agent with optional handoff to research agent for refinement."""
-        
-        critique_instructions = """
+
+_CRITIQUE_INSTRUCTIONS: Final[str] = """
 You are an expert fact checker with a focus on finding the factual discrepancies and nuances.
 Be very careful in finding the distinctions between claims, supporting links, and info sources.
 Pay special attention to claims addressing products unrelated to user query and incomplete compliance coverage.
 
-IMPORTANT: You MUST use the verify_url tool to test every API endpoint mentioned in the research report. This is critical for validating source accessibility and API claims.
+IMPORTANT: You MUST verify every API endpoint mentioned in the research report. This is critical for validating source accessibility and API claims.
+
+The critique request ends with URLS_TO_VERIFY and REPOS_TO_QUERY checklists extracted from the report. Work through those lists instead of re-scanning the report for URLs and repositories; only add items the extraction clearly missed.
+Pass the whole URLS_TO_VERIFY list to a single verify_urls call (up to 100 URLs per call) rather than calling verify_url once per URL.
 
 CRITICAL: For ANY GitHub repository mentioned in the research (even just the name like "facebook/react" or URLs like "https://github.com/user/repo"), you MUST immediately use the DeepWiki MCP tools to gather additional information:
-1. First use ask_question to get basic information about the repository
-2. Use ask_question again for specific technical details relevant to the research topic
+1. Call ask_questions_batch once per repository, asking for basic information about the repository together with the specific technical details relevant to the research topic (up to 5 questions)
+2. Use ask_question only for a single follow-up question that the batch answers raised
 3. If MCP tools timeout or fail, note this in your critique and continue with other verification methods
 
 Tool Usage Guidelines:
@@ -87,15 +70,14 @@ MANDATORY: If the research mentions ANY of these patterns, use MCP tools immedia
     - Any reference to "GitHub repository" or "repo" or "source code"
 
 Examples of DeepWiki MCP use:
-    - ask_question(repoName="openai/openai-python", question="What is this repository about?")
-    - ask_question(repoName="openai/openai-python", question="How does authentication work?")
-    - ask_question(repoName="vercel/next.js", question="What are the main API components?")
+    - ask_questions_batch(repoName="openai/openai-python", questions=["What is this repository about?", "How does authentication work?"])
+    - ask_questions_batch(repoName="vercel/next.js", questions=["What is this repository about?", "What are the main API components?"])
     - ask_question(repoName="tensorflow/tensorflow", question="How to implement custom models?")
 
-- Use verify_url tool to check select API endpoints to verify if they actually exist
-Examples of when to use verify_url:
-- Testing API endpoint: verify_url("https://api.openai.com/v1/models")
-- Checking API documentation: verify_url("https://docs.example.com/api")  
+- Use verify_urls tool to check API endpoints and cited URLs in one batch to verify if they actually exist
+Examples of when to use verify_urls:
+- Testing API endpoints and documentation: verify_urls(["https://api.openai.com/v1/models", "https://docs.example.com/api"])
+- Use verify_url only for a single URL found later in the critique: verify_url("https://docs.example.com/api")
 
 RESEARCH QUALITY ASSESSMENT:
 After completing your critique, evaluate the research quality:
@@ -116,60 +98,8 @@ If the research plus critique is adequate to form a final report:
 
 Be thorough but concise in your assessment, highlighting both strengths and areas for improvement.
 """
-        
-        handoffs = []
-        if research_agent:
-            handoffs.append(research_agent)
-        
-        return Agent(
-            name="CritiqueAgent", 
-            instructions=critique_instructions,
-            model=MODEL_CRITIQUE,
-            model_settings=ResearchAgents._create_base_model_settings(),
-            tools=[
-                WebSearchTool(),
-                verify_url
-            ],
-            handoffs=handoffs
-        )
-    
-    @staticmethod
-    async def create_critique_agent_with_mcp(research_agent=None) -> tuple[Agent, MCPServerSse]:
-        """Create critique agent with connected MCP server. Returns (agent, mcp_server) tuple."""
-        
-        # Create and connect DeepWiki MCP server with robust timeout settings
-        deepwiki_server = MCPServerSse(
-            params={
-                "url": "https://mcp.deepwiki.com/sse",
-                "timeout": 30,  # Connection timeout: 30 seconds
-                "sse_read_timeout": 600,  # SSE read timeout: 10 minutes  
-            },
-            client_session_timeout_seconds=60.0,  # ClientSession read timeout: 60 seconds
-            cache_tools_list=True,
-            name="DeepWiki"
-        )
-        
-        # Connect the server
-        await deepwiki_server.connect()
-        
-        # Create base agent
-        agent = ResearchAgents.create_critique_agent(research_agent)
-        
-        # Add MCP server to agent with strict schema configuration and timeout settings
-        agent.mcp_servers = [deepwiki_server]
-        agent.mcp_config = {
-            "convert_schemas_to_strict": True,
-            "timeout": 30,  # Tool call timeout in seconds
-            "request_timeout": 60  # Request timeout in seconds
-        }
-        
-        return agent, deepwiki_server
-    
-    @staticmethod
-    def create_final_report_agent() -> Agent:
-        """Create the final report agent."""
-        
-        final_report_instructions = """
+
+_FINAL_REPORT_INSTRUCTIONS: Final[str] = """
 You are a professional report writer specializing in creating comprehensive, well-formatted markdown reports.
 Your role is to synthesize research findings and critique feedback into a polished final document.
 The goal is not to mention changes and critique points, but synthesize a high-quality new report with relevant links supporting the claims.
@@ -177,7 +107,7 @@ The goal is not to mention changes and critique points, but synthesize a high-qu
 You will receive:
 1. Original research content with findings and sources
 2. Detailed critique analysis highlighting strengths and weaknesses
-3. Token usage statistics for cost calculation
+3. A precomputed cost table for the research and critique steps
 
 Your task is to create a unified, professional markdown report that:
 
@@ -192,21 +122,10 @@ SOURCE CITATION REQUIREMENTS:
 -  It is imperative that references are followed by source citations.
 -  Pay special attention not to separate references and their matching urls. 
 
-COST CALCULATION REQUIREMENTS:
-- MANDATORY: Find the current OpenAI pricing for all models in use using a fetch tool for website https://platform.openai.com/docs/pricing 
-- DO NOT map model names, do separate searches for all models in use, such as "o4-mini-deep-research pricing site:openai.com", or "o3-pro pricing site:openai.com", etc.
-- Note different pricing tiers: input tokens, output tokens, cached input tokens, and reasoning tokens (free because they are part of output)
-- Remember that cached tokens are part of the total input tokens. So do not double-count them.
-- MANDATORY: write code and call code_interpreter tool to calculate accurate total costs based on prices for ALL models found in the token usage statistics (o4-mini-deep-research, o4-mini, etc.)
-- Create a detailed cost breakdown table showing:
-  * Each model used (o4-mini-deep-research, o4-mini, o3-pro, o3, etc.)
-  * Token counts by type (input, output, cached, reasoning)
-  * Cost per token type for each model from site:https://platform.openai.com/docs/pricing
-  * Total cost per model, rounded to cents (1/100th of a dollar)
-  * Grand total cost for entire workflow, rounded to cents (1/100th of a dollar)
-  * IMPORTANT: the table should include results of cost calculation program run in the code_interpreter tool. DO NOT assume or approximate total costs without running a program!
-- Present costs in a clear, professional format with tables showing cost breakdown by model and operation
-- Include actual total cost estimation for the workflow of research + critique. Do not simulate estimates, you must write code to compute the costs.
+COST ANALYSIS REQUIREMENTS:
+- The request ends with a COST ANALYSIS section: a cost table already computed from the token usage statistics and a fixed price list.
+- Copy that table into the Cost Analysis section unchanged, including the pricing note above it. Do not recompute, re-price, or estimate costs.
+- You may add one or two sentences interpreting the table (e.g. which model dominates the cost).
 
 MARKDOWN FORMATTING REQUIREMENTS:
 - Use proper markdown headers (# ## ###)
@@ -251,27 +170,338 @@ STRUCTURE TEMPLATE:
 [Honest assessment of research limitations and areas for future investigation]
 
 ## Cost Analysis
-[Detailed table breakdown of token usage and costs by model/operation]
+[The precomputed cost table from the request, copied unchanged]
 
 ```
 
-Create a comprehensive, professional report that combines the research depth with critical analysis and accurate cost calculations to provide maximum value to the reader.
+Create a comprehensive, professional report that combines the research depth with critical analysis and the precomputed cost analysis to provide maximum value to the reader.
 """
+
+# Checklist extraction for critique messages, compiled once
+# Parentheses are allowed in URLs (e.g. Wikipedia's Python_(programming_language));
+# an unmatched closing one is trimmed by _clean_url
+_URL_RE = re.compile(r"https?://[^\s\]\"'<>]+")
+_GITHUB_REPO_URL_RE = re.compile(r"^https?://(?:www\.)?github\.com/([\w.-]+)/([\w.-]+)", re.IGNORECASE)
+_BARE_REPO_RE = re.compile(r"(?<![\w./:-])([A-Za-z0-9][\w.-]*)/([A-Za-z0-9][\w.-]*)(?![\w/])")
+# Bare owner/repo names only count on lines that talk about GitHub or repositories,
+# which keeps most prose, dates and fractions out of the checklist
+_REPO_CONTEXT_RE = re.compile(r"\bgithub\b|\brepos?\b|\brepositor(?:y|ies)\b", re.IGNORECASE)
+_URL_TRAILING_PUNCT = ".,;:!?"
+# Common slash pairs in prose that are never repositories
+_NOT_REPOS = frozenset({"and/or", "input/output", "read/write", "on/off", "yes/no", "true/false",
+                        "client/server", "i/o", "n/a", "he/she", "his/her", "either/or"})
+
+def _clean_url(url: str) -> str:
+    """Strip trailing punctuation and unmatched closing parentheses (e.g. from markdown links) from a URL."""
+    while url:
+        if url[-1] in _URL_TRAILING_PUNCT:
+            url = url[:-1]
+        elif url[-1] == ")" and url.count(")") > url.count("("):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+def _extract_checklists(research_content: str) -> tuple[List[str], List[str]]:
+    """Return the unique URLs and GitHub owner/repo names mentioned in a report, sorted."""
+    urls = {_clean_url(url) for url in _URL_RE.findall(research_content)}
+    repos = set()
+    for url in urls:
+        match = _GITHUB_REPO_URL_RE.match(url)
+        if match:
+            repos.add(f"{match.group(1)}/{match.group(2).removesuffix('.git')}")
+    for line in research_content.splitlines():
+        if _REPO_CONTEXT_RE.search(line):
+            # Drop URLs first so their path segments aren't read as owner/repo pairs
+            for owner, repo in _BARE_REPO_RE.findall(_URL_RE.sub(" ", line)):
+                name = f"{owner}/{repo.rstrip('.')}"
+                if not (owner.isdigit() or repo.isdigit() or name.lower() in _NOT_REPOS):
+                    repos.add(name)
+    return sorted(urls), sorted(repos)
+
+# Fixed parts of the critique and final report messages; the dynamic parts are joined in between
+_CRITIQUE_MSG_HEAD = "Please critique the following research report for the original query: '"
+_CRITIQUE_MSG_CONTENT = "'\n\nResearch Content:\n"
+_CRITIQUE_MSG_URLS = "\n\nURLS_TO_VERIFY:\n"
+_CRITIQUE_MSG_REPOS = "\n\nREPOS_TO_QUERY:\n"
+_CRITIQUE_MSG_TAIL = (
+    "\n\nProvide a comprehensive critique analyzing factual accuracy, source quality, "
+    "completeness, and any gaps or biases."
+)
+
+_FINAL_REPORT_MSG_HEAD = (
+    "Start creating a comprehensive final markdown report that synthesizes the research findings and critique analysis.\n"
+    "        Include all sections outlined in the system prompt.\n\n"
+    "Original Research Query: '"
+)
+_FINAL_REPORT_MSG_RESEARCH = "'\n\nRESEARCH CONTENT:\n"
+_FINAL_REPORT_MSG_CRITIQUE = "\n\nCRITIQUE ANALYSIS:\n"
+_FINAL_REPORT_MSG_COST = "\n\nCOST ANALYSIS:\n"
+
+# Shared tool instances; they hold configuration only, so agents can share them
+@lru_cache(maxsize=1)
+def _web_search_tool() -> WebSearchTool:
+    return WebSearchTool()
+
+@lru_cache(maxsize=1)
+def _code_interpreter_tool() -> CodeInterpreterTool:
+    tool_config: "CodeInterpreter" = {
+        "type": "code_interpreter",
+        "container": {"type": "auto", "file_ids": []},
+    }
+    return CodeInterpreterTool(tool_config=tool_config)
+
+class _DeepWikiServer(MCPServerSse):
+    """MCPServerSse whose tool calls share the "deepwiki" rate limit and cache read-only answers."""
+    
+    # Only question answering is cached; other tools pass straight through
+    _CACHED_TOOLS = frozenset({"ask_question"})
+    _answers = AsyncTTLCache(should_cache=lambda result: not getattr(result, "isError", False))
+    
+    async def call_tool(self, tool_name, arguments):
+        if tool_name not in self._CACHED_TOOLS:
+            return await self._call_tool_limited(tool_name, arguments)
+        key = (tool_name, orjson.dumps(arguments or {}, option=orjson.OPT_SORT_KEYS))
+        return await self._answers.get_or_call(key, lambda: self._call_tool_limited(tool_name, arguments))
+    
+    async def _call_tool_limited(self, tool_name, arguments):
+        await tool_rate_limiter.acquire("deepwiki")
+        return await super().call_tool(tool_name, arguments)
+
+def _tool_result_text(result: Any) -> str:
+    """Text of an MCP tool result (or of the exception raised instead)."""
+    if isinstance(result, BaseException):
+        return f"Error: {result}"
+    text = "\n".join(item.text for item in result.content if getattr(item, "text", None))
+    return f"Error: {text}" if getattr(result, "isError", False) else text
+
+def _ask_questions_batch_tool(deepwiki_server: MCPServerSse) -> FunctionTool:
+    """Build the ask_questions_batch tool bound to a connected DeepWiki server."""
+    
+    @function_tool
+    async def ask_questions_batch(repoName: str, questions: List[str]) -> Dict[str, str]:
+        """
+        Ask DeepWiki several questions about one GitHub repository in a single call.
+        
+        Args:
+            repoName: GitHub repository in owner/repo form, e.g. "openai/openai-python"
+            questions: Questions about the repository (at most 5)
+            
+        Returns:
+            Dictionary mapping each question to DeepWiki's answer
+        """
+        if len(questions) > ASK_QUESTIONS_MAX:
+            return {"error": f"Too many questions ({len(questions)}) - pass at most {ASK_QUESTIONS_MAX} per call"}
+        # Questions run concurrently; call_tool applies the DeepWiki rate limit and answer cache
+        results = await asyncio.gather(
+            *(deepwiki_server.call_tool("ask_question", {"repoName": repoName, "question": question})
+              for question in questions),
+            return_exceptions=True,
+        )
+        return {question: _tool_result_text(result) for question, result in zip(questions, results)}
+    
+    return ask_questions_batch
+
+class _MCPPool:
+    """
+    One lazily connected DeepWiki MCP server shared by every critique run in the process.
+    
+    The SSE client is bound to the task that connected it, so workflows connect and
+    close the pool from the same task (run_cli's).
+    """
+    
+    _server: Optional[MCPServerSse] = None
+    # One lock per event loop: asyncio locks bind to the loop they are first contended on
+    _locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+    
+    @classmethod
+    def _lock(cls) -> asyncio.Lock:
+        """Get the pool lock for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        lock = cls._locks.get(loop)
+        if lock is None:
+            lock = cls._locks[loop] = asyncio.Lock()
+        return lock
+    
+    @classmethod
+    async def acquire(cls) -> MCPServerSse:
+        """Return the shared server, connecting it on first use or after a reset."""
+        async with cls._lock():
+            if cls._server is None or cls._server.session is None:
+                server = ResearchAgents._create_deepwiki_server()
+                await server.connect()
+                cls._server = server
+            return cls._server
+    
+    @classmethod
+    async def close(cls):
+        """Clean up the shared server; the next acquire() reconnects."""
+        async with cls._lock():
+            server, cls._server = cls._server, None
+            if server is not None:
+                await server.cleanup()
+
+def _model_service_tier(model: str, service_tier: Optional[str]) -> Optional[str]:
+    """Service tier to request for model; the flex tier is dropped for models that do not offer it."""
+    if service_tier == SERVICE_TIER_FLEX and model not in FLEX_MODELS:
+        return None
+    return service_tier
+
+class ResearchAgents:
+    """Factory class for creating research agents and prompt templates."""
+    
+    # Agents shared across workflow phases, keyed by (model, service_tier)
+    _research_agents: Dict[tuple, Agent] = {}
+    _final_report_agents: Dict[tuple, Agent] = {}
+    # Critique agents without MCP servers, keyed by (model, service_tier, id(research_agent))
+    _critique_agents: Dict[tuple, Agent] = {}
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _create_base_model_settings(service_tier: Optional[str] = None) -> ModelSettings:
+        """Create standardized model settings for all agents."""
+        extra_body = {"service_tier": service_tier} if service_tier else None
+        reasoning: "Reasoning" = {"summary": "auto"}
+        return ModelSettings(reasoning=reasoning, extra_body=extra_body)
+    
+    @staticmethod
+    def create_research_agent() -> Agent:
+        """Create the main research agent."""
+        
+        return Agent(
+            name="ResearchAgent",
+            instructions=_RESEARCH_INSTRUCTIONS,
+            model=MODEL_RESEARCH,
+            model_settings=ResearchAgents._create_base_model_settings(),
+            tools=[_web_search_tool(), _code_interpreter_tool()],
+            handoffs=[]
+        )
+    
+    
+    @staticmethod
+    def create_critique_agent(research_agent=None, service_tier: Optional[str] = None) -> Agent:
+        """Create the critique agent with optional handoff to research agent for refinement."""
+        
+        handoffs = []
+        if research_agent:
+            # The research agent gets the conversation without tool calls and results
+            # (URL checks, MCP answers, searches): it needs the report and critique, not
+            # every tool payload billed again as input tokens
+            handoffs.append(handoff(research_agent, input_filter=handoff_filters.remove_all_tools))
+        
+        return Agent(
+            name="CritiqueAgent", 
+            instructions=_CRITIQUE_INSTRUCTIONS,
+            model=MODEL_CRITIQUE,
+            model_settings=ResearchAgents._create_base_model_settings(_model_service_tier(MODEL_CRITIQUE, service_tier)),
+            tools=[_web_search_tool(), verify_urls, verify_url],
+            handoffs=handoffs
+        )
+    
+    @staticmethod
+    def _create_deepwiki_server() -> MCPServerSse:
+        """Create the (unconnected) DeepWiki MCP server with robust timeout settings."""
+        return _DeepWikiServer(
+            params={
+                "url": "https://mcp.deepwiki.com/sse",
+                "timeout": 30,  # Connection timeout: 30 seconds
+                "sse_read_timeout": 600,  # SSE read timeout: 10 minutes  
+            },
+            client_session_timeout_seconds=60.0,  # ClientSession read timeout: 60 seconds
+            cache_tools_list=True,
+            name="DeepWiki"
+        )
+    
+    @staticmethod
+    @asynccontextmanager
+    async def mcp_server_context() -> AsyncIterator[MCPServerSse]:
+        """
+        Pooled DeepWiki MCP server for the duration of the block.
+        
+        The connection stays open for later critique runs; if the block fails it is
+        dropped so the next run reconnects instead of reusing a broken session.
+        """
+        deepwiki_server = await _MCPPool.acquire()
+        try:
+            yield deepwiki_server
+        except Exception:
+            await _MCPPool.close()
+            raise
+    
+    @staticmethod
+    async def close_mcp_server():
+        """Close the pooled DeepWiki MCP connection, if any."""
+        await _MCPPool.close()
+    
+    @staticmethod
+    async def create_critique_agent_with_mcp(research_agent=None, service_tier: Optional[str] = None,
+                                             mcp_server: Optional[MCPServerSse] = None) -> tuple[Agent, MCPServerSse]:
+        """
+        Create critique agent with connected MCP server. Returns (agent, mcp_server) tuple.
+        
+        An already connected mcp_server is reused; otherwise the pooled server is used,
+        which is closed by close_mcp_server() rather than by the caller.
+        """
+        
+        deepwiki_server = mcp_server
+        if deepwiki_server is None:
+            deepwiki_server = await _MCPPool.acquire()
+        
+        # Clone the shared base agent and attach the MCP server with strict schema configuration and timeout settings
+        base_agent = ResearchAgents.get_critique_agent(research_agent, service_tier)
+        agent = base_agent.clone(
+            tools=[*base_agent.tools, _ask_questions_batch_tool(deepwiki_server)],
+            mcp_servers=[deepwiki_server],
+            mcp_config={
+                "convert_schemas_to_strict": True,
+                "timeout": 30,  # Tool call timeout in seconds
+                "request_timeout": 60  # Request timeout in seconds
+            },
+        )
+        
+        return agent, deepwiki_server
+    
+    @staticmethod
+    def create_final_report_agent(service_tier: Optional[str] = None) -> Agent:
+        """Create the final report agent."""
         
         return Agent(
             name="FinalReportAgent",
-            instructions=final_report_instructions,
+            instructions=_FINAL_REPORT_INSTRUCTIONS,
             model=MODEL_FINAL_REPORT,
-            model_settings=ResearchAgents._create_base_model_settings(),
-            tools=[
-                CodeInterpreterTool(tool_config=CodeInterpreter(
-                    type="code_interpreter",
-                    container={"type": "auto", "file_ids": []}
-                )),
-                WebSearchTool()
-            ]
+            model_settings=ResearchAgents._create_base_model_settings(_model_service_tier(MODEL_FINAL_REPORT, service_tier)),
+            # No tools: costs are computed in Python and passed in the request
+            tools=[]
         )
     
+    @classmethod
+    def get_research_agent(cls) -> Agent:
+        """Get the shared research agent, creating it on first use."""
+        key = (MODEL_RESEARCH, None)
+        agent = cls._research_agents.get(key)
+        if agent is None:
+            agent = cls._research_agents[key] = cls.create_research_agent()
+        return agent
+    
+    @classmethod
+    def get_critique_agent(cls, research_agent=None, service_tier: Optional[str] = None) -> Agent:
+        """Get the shared critique agent (without MCP servers) for a handoff target and service tier."""
+        # The cached agent holds research_agent as a handoff, so its id() stays unique while cached
+        key = (MODEL_CRITIQUE, service_tier, id(research_agent) if research_agent else None)
+        agent = cls._critique_agents.get(key)
+        if agent is None:
+            agent = cls._critique_agents[key] = cls.create_critique_agent(research_agent, service_tier)
+        return agent
+    
+    @classmethod
+    def get_final_report_agent(cls, service_tier: Optional[str] = None) -> Agent:
+        """Get the shared final report agent for a service tier, creating it on first use."""
+        key = (MODEL_FINAL_REPORT, service_tier)
+        agent = cls._final_report_agents.get(key)
+        if agent is None:
+            agent = cls._final_report_agents[key] = cls.create_final_report_agent(service_tier)
+        return agent
+    
     
     # ============================================================================
     # PROMPT TEMPLATES - Centralized dynamic message creation for workflows
@@ -289,15 +519,17 @@ Create a comprehensive, professional report that combines the research depth wit
         Returns:
             Formatted message for the critique agent
         """
-        return f"""Please critique the following research report for the original query: '{query}'
-
-Research Content:
-{research_content}
-
-Provide a comprehensive critique analyzing factual accuracy, source quality, completeness, and any gaps or biases."""
+        urls, repos = _extract_checklists(research_content)
+        urls_list = "\n".join(f"- {url}" for url in urls) or "- (none found)"
+        repos_list = "\n".join(f"- {repo}" for repo in repos) or "- (none found)"
+        return "".join((
+            _CRITIQUE_MSG_HEAD, query, _CRITIQUE_MSG_CONTENT, research_content,
+            _CRITIQUE_MSG_URLS, urls_list, _CRITIQUE_MSG_REPOS, repos_list, _CRITIQUE_MSG_TAIL,
+        ))
     
     @staticmethod
-    def create_final_report_message(query: str, research_content: str, critique_content: str) -> str:
+    def create_final_report_message(query: str, research_content: str, critique_content: str,
+                                    cost_table: str = "") -> str:
         """
         Create a dynamic final report message integrating the research and critique content.
         
@@ -305,21 +537,14 @@ Provide a comprehensive critique analyzing factual accuracy, source quality, com
             query: The original research query
             research_content: The research findings
             critique_content: The critique analysis
+            cost_table: Precomputed markdown cost table for the research and critique steps
             
         Returns:
             Formatted message for the final report agent
         """
-        return f"""Start creating a comprehensive final markdown report that synthesizes the research findings and critique analysis.
-        Include all sections and model cost lookups and calculations outlined in the system prompt.
-
-Original Research Query: '{query}'
-
-RESEARCH CONTENT:
-{research_content}
-
-CRITIQUE ANALYSIS:
-{critique_content}
-
-"""
+        return "".join((
+            _FINAL_REPORT_MSG_HEAD, query, _FINAL_REPORT_MSG_RESEARCH, research_content,
+            _FINAL_REPORT_MSG_CRITIQUE, critique_content, _FINAL_REPORT_MSG_COST, cost_table, "\n\n",
+        ))
     
     
@@ -6,6 +6,7 @@ Standalone test script to verify MCP DeepWiki connection.
 import asyncio
 import sys
 import time
+import httpx
 from agents.mcp import MCPServerSse
 
 async def test_mcp_connection():
@@ -74,21 +75,29 @@ async def test_basic_connectivity():
     print("\n🌐 Testing basic HTTP connectivity...")
     
     try:
-        import urllib.request
-        import urllib.error
+        # Simple HTTP test with proper headers; the SSE stream is read only up to its first event
+        headers = {
+            'Accept': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'User-Agent': 'Mozilla/5.0 (compatible; MCP-Client/1.0)',
+        }
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            async with client.stream("GET", "https://mcp.deepwiki.com/sse", headers=headers) as response:
+                print(f"📡 HTTP Status: {response.status_code}")
+                print(f"📋 Content-Type: {response.headers.get('Content-Type')}")
+                first_event = None
+                async for line in response.aiter_lines():
+                    if line.startswith(("event:", "data:")):
+                        first_event = line
+                        break
         
-        # Simple HTTP test with proper headers
-        req = urllib.request.Request("https://mcp.deepwiki.com/sse")
-        req.add_header('Accept', 'text/event-stream')
-        req.add_header('Cache-Control', 'no-cache')
-        req.add_header('User-Agent', 'Mozilla/5.0 (compatible; MCP-Client/1.0)')
-        
-        with urllib.request.urlopen(req, timeout=10) as response:
-            print(f"📡 HTTP Status: {response.status}")
-            print(f"📋 Headers: {dict(response.headers)}")
-            print("✅ Basic connectivity successful")
+        if first_event is None:
+            print("❌ SSE stream ended without an event")
+            return False
+        print(f"📨 First SSE line: {first_event}")
+        print("✅ Basic connectivity successful")
             
-    except urllib.error.URLError as e:
+    except httpx.HTTPError as e:
         print(f"❌ HTTP connectivity error: {e}")
         return False
     except Exception as e:
@@ -102,23 +111,21 @@ async def main():
     print("🚀 MCP DeepWiki Connection Test")
     print("=" * 50)
     
-    # Test basic connectivity first
-    connectivity_ok = await test_basic_connectivity()
+    # Both tests are independent network I/O, so run them concurrently
+    connectivity_ok, mcp_ok = await asyncio.gather(
+        test_basic_connectivity(), test_mcp_connection(), return_exceptions=True
+    )
     
-    if connectivity_ok:
-        print("\n" + "=" * 50)
-        # Test full MCP connection
-        mcp_ok = await test_mcp_connection()
-        
-        if mcp_ok:
-            print("\n🎉 All tests passed!")
-            return 0
-        else:
-            print("\n💥 MCP connection test failed!")
-            return 1
-    else:
+    print("\n" + "=" * 50)
+    if isinstance(connectivity_ok, BaseException) or not connectivity_ok:
         print("\n💥 Basic connectivity test failed!")
         return 1
+    if isinstance(mcp_ok, BaseException) or not mcp_ok:
+        print("\n💥 MCP connection test failed!")
+        return 1
+    
+    print("\n🎉 All tests passed!")
+    return 0
 
 if __name__ == "__main__":
     exit_code = asyncio.run(main())
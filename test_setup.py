@@ -5,7 +5,12 @@ Test script to validate the agentic research setup.
 
 import sys
 import os
+import asyncio
+import contextlib
+import io
+import tempfile
 import importlib.util
+from unittest import mock
 
 def test_imports():
     """Test that all required modules can be imported."""
@@ -64,10 +69,12 @@ def test_config():
         assert hasattr(config, 'MODEL_RESEARCH')
         assert hasattr(config, 'MODEL_CRITIQUE')
         assert hasattr(config, 'RESULTS_DIR')
+        assert hasattr(config, 'ensure_results_dir')
         
         print("✅ Configuration structure is valid")
         
         # Test results directory creation
+        config.ensure_results_dir()
         if os.path.exists(config.RESULTS_DIR):
             print("✅ Results directory exists")
         else:
@@ -140,6 +147,226 @@ def test_cli_parsing():
     
     return True
 
+def test_checklist_extraction():
+    """Test URL and repository checklist extraction for critique messages."""
+    
+    print("\nTesting checklist extraction...")
+    
+    try:
+        from research_agents import _extract_checklists
+        
+        # "report" is not repository context, so its slash pairs are not repos
+        report = (
+            "This report covers CI/CD and TCP/IP support.\n"
+            "The report lists ISO/IEC and SOC2/HIPAA certifications.\n"
+            "GitHub repositories: facebook/react, openai/openai-python\n"
+        )
+        _, repos = _extract_checklists(report)
+        assert repos == ["facebook/react", "openai/openai-python"], repos
+        print("✅ Repositories are only taken from GitHub/repository lines")
+        
+        # Balanced parentheses are part of the URL; an unmatched closing one is not
+        urls, _ = _extract_checklists(
+            "See https://en.wikipedia.org/wiki/Python_(programming_language).\n"
+            "Details in [the docs](https://docs.python.org/3/library/re.html).\n"
+            "(source: https://en.wikipedia.org/wiki/Mercury_(planet))\n"
+        )
+        assert urls == [
+            "https://docs.python.org/3/library/re.html",
+            "https://en.wikipedia.org/wiki/Mercury_(planet)",
+            "https://en.wikipedia.org/wiki/Python_(programming_language)",
+        ], urls
+        print("✅ URLs keep balanced parentheses and drop unmatched ones")
+        
+    except Exception as e:
+        print(f"❌ Checklist extraction test failed: {e!r}")
+        return False
+    
+    return True
+
+def test_event_loop_reuse():
+    """Test that shared asyncio primitives work across successive event loops."""
+    
+    print("\nTesting repeated event loops...")
+    
+    try:
+        from config import VERIFY_CONCURRENCY
+        from tools import _get_verify_semaphore, tool_rate_limiter
+        from research_agents import _MCPPool
+        
+        async def hold(primitive):
+            async with primitive:
+                await asyncio.sleep(0)
+        
+        async def contend():
+            # More holders than slots, so every primitive is waited on (which binds it to the loop)
+            await asyncio.gather(*(hold(_get_verify_semaphore()) for _ in range(VERIFY_CONCURRENCY + 1)))
+            await asyncio.gather(hold(_MCPPool._lock()), hold(_MCPPool._lock()))
+            await asyncio.gather(hold(tool_rate_limiter._lock()), hold(tool_rate_limiter._lock()))
+        
+        # Two runs, as with two run_cli() calls in one process
+        asyncio.run(contend())
+        asyncio.run(contend())
+        print("✅ URL-check semaphore and pool locks work on a second event loop")
+        
+    except Exception as e:
+        print(f"❌ Event loop reuse test failed: {e!r}")
+        return False
+    
+    return True
+
+def test_url_redirect_blocking():
+    """Test that URL checks do not follow redirects into internal addresses."""
+    
+    print("\nTesting URL redirect blocking...")
+    
+    try:
+        import httpx
+        import tools
+        
+        # Offline server: /metadata redirects to the cloud metadata address, /moved to a public page
+        def handler(request):
+            if request.url.path == "/metadata":
+                return httpx.Response(302, headers={"Location": "http://169.254.169.254/latest/meta-data/"})
+            if request.url.path == "/moved":
+                return httpx.Response(301, headers={"Location": "https://example.com/final"})
+            if request.url.host == "169.254.169.254":
+                raise AssertionError("internal address was requested")
+            return httpx.Response(200)
+        
+        async def check(url):
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with mock.patch.object(tools, "_get_http_client", lambda: client):
+                    return await tools._verify_url(url)
+        
+        # Anything not globally routable is internal, including reserved and multicast ranges
+        for address in ("127.0.0.1", "10.0.0.1", "169.254.169.254", "100.64.0.1", "240.0.0.1", "224.0.0.1", "ff02::1", "::1"):
+            assert tools._is_internal_ip(address), address
+        assert not tools._is_internal_ip("8.8.8.8")
+        print("✅ Non-public addresses are treated as internal")
+        
+        result = asyncio.run(check("https://example.com/metadata"))
+        assert not result["success"] and "blocked" in result["error"], result
+        print("✅ Redirect to an internal address is blocked")
+        
+        result = asyncio.run(check("https://example.com/moved"))
+        assert result["status_code"] == 200 and result["final_url"] == "https://example.com/final", result
+        print("✅ Redirects to public addresses are followed")
+        
+    except Exception as e:
+        print(f"❌ URL redirect blocking test failed: {e!r}")
+        return False
+    
+    return True
+
+def test_verify_urls_limit():
+    """Test that verify_urls rejects oversized batches with a single error result."""
+    
+    print("\nTesting verify_urls batch limit...")
+    
+    try:
+        import tools
+        from config import VERIFY_URLS_MAX
+        
+        # Over-limit batches get one top-level error result, not a fake "error" URL entry
+        urls = [f"https://example.com/{i}" for i in range(VERIFY_URLS_MAX + 1)]
+        result = asyncio.run(tools._verify_urls(urls))
+        assert result["success"] is False and "Too many URLs" in result["error"], result
+        assert not any(url in result for url in urls), result
+        print("✅ Over-limit URL batches return a single error result")
+        
+    except Exception as e:
+        print(f"❌ verify_urls batch limit test failed: {e!r}")
+        return False
+    
+    return True
+
+def _run_cli_offline(argv, workflow_error=None, mcp_error=None):
+    """
+    Run main.run_cli(argv) without API calls and return its exit code.
+    
+    The workflow raises workflow_error instead of running agents; if only mcp_error is
+    given, the real workflow runs and connecting the DeepWiki MCP server raises it.
+    Output is discarded and token usage is written to a temporary directory.
+    """
+    import main as main_module
+    
+    async def failing_workflow(context, args, results):
+        raise workflow_error
+    
+    with contextlib.ExitStack() as stack:
+        tmp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(mock.patch("cli.OPENAI_API_KEY", "test-key"))
+        stack.enter_context(mock.patch.object(main_module, "get_async_client", lambda: None))
+        stack.enter_context(mock.patch.object(main_module, "set_default_openai_client", lambda client: None))
+        stack.enter_context(mock.patch.object(main_module, "TOKEN_USAGE_PATH", os.path.join(tmp_dir, "token_usage.json")))
+        if workflow_error is not None:
+            stack.enter_context(mock.patch.object(main_module, "run_standalone_workflow", failing_workflow))
+        if mcp_error is not None:
+            async def failing_connect():
+                raise mcp_error
+            stack.enter_context(mock.patch("research_agents._MCPPool.acquire", failing_connect))
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+        return asyncio.run(main_module.run_cli(argv))
+
+def test_exit_codes():
+    """Test that agent failures are reported through their exit codes."""
+    
+    print("\nTesting exit codes...")
+    
+    try:
+        from main import AgentRunError
+        from config import EXIT_RESEARCH_AGENT_ERROR, EXIT_CRITIQUE_AGENT_ERROR, EXIT_FINAL_REPORT_AGENT_ERROR
+        
+        # Each failing agent returns its own exit code instead of exiting early
+        expected_codes = {
+            "research": EXIT_RESEARCH_AGENT_ERROR,
+            "critique": EXIT_CRITIQUE_AGENT_ERROR,
+            "final_report": EXIT_FINAL_REPORT_AGENT_ERROR,
+        }
+        for agent, expected in expected_codes.items():
+            code = _run_cli_offline(["-q", "test", "-c", "-r"], AgentRunError(agent, RuntimeError(f"{agent} failed")))
+            assert code == expected, f"{agent}: expected {expected}, got {code}"
+            print(f"✅ {agent} failure returns exit code {expected}")
+        
+        # Setup failures outside the agent stream are tagged too: a failed MCP connect
+        # in critique-only mode is a critique error, as in research + critique mode
+        code = _run_cli_offline(["--critique-only", "--input-file", "research.txt", "-q", "test"],
+                                mcp_error=ConnectionError("DeepWiki unreachable"))
+        assert code == EXIT_CRITIQUE_AGENT_ERROR, f"critique-only MCP connect: expected {EXIT_CRITIQUE_AGENT_ERROR}, got {code}"
+        print(f"✅ Critique-only MCP connect failure returns exit code {EXIT_CRITIQUE_AGENT_ERROR}")
+        
+    except BaseException as e:
+        print(f"❌ Exit code test failed: {e!r}")
+        return False
+    
+    return True
+
+def test_run_cli_return_codes():
+    """Test that run_cli returns exit codes to programmatic callers instead of exiting."""
+    
+    print("\nTesting run_cli return codes...")
+    
+    try:
+        from config import EXIT_VALIDATION_ERROR, EXIT_GENERAL_ERROR
+        
+        # Invalid arguments: critique-only mode without a query
+        code = _run_cli_offline(["--critique-only"])
+        assert code == EXIT_VALIDATION_ERROR, f"expected {EXIT_VALIDATION_ERROR}, got {code}"
+        print("✅ Validation error returns the validation exit code")
+        
+        # Workflow error not tied to an agent
+        code = _run_cli_offline(["-q", "test"], RuntimeError("workflow failed"))
+        assert code == EXIT_GENERAL_ERROR, f"expected {EXIT_GENERAL_ERROR}, got {code}"
+        print("✅ Workflow error returns the general exit code")
+        
+    except BaseException as e:
+        print(f"❌ run_cli return code test failed: {e!r}")
+        return False
+    
+    return True
+
 def main():
     """Run all tests."""
     
@@ -153,7 +380,13 @@ def main():
         test_imports,
         test_config,
         test_agent_creation,
-        test_cli_parsing
+        test_cli_parsing,
+        test_checklist_extraction,
+        test_event_loop_reuse,
+        test_url_redirect_blocking,
+        test_verify_urls_limit,
+        test_exit_codes,
+        test_run_cli_return_codes
     ]
     
     passed = 0
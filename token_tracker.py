@@ -1,16 +1,22 @@
 """Token usage tracking system for the agentic research tool."""
 
-import json
 import time
+import orjson
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from collections import defaultdict
+from operator import attrgetter
+from config import MODEL_PRICING, PRICING_UPDATED
 
-@dataclass
+# Usage object fields read by TokenUsage.from_openai_usage
+_USAGE_FIELDS_GETTER = attrgetter('requests', 'input_tokens', 'output_tokens', 'total_tokens',
+                                  'input_tokens_details', 'output_tokens_details')
+
+@dataclass(slots=True)
 class TokenUsage:
     """Token usage information for a single model response."""
     model: str
-    timestamp: float
+    timestamp_ns: int  # Wall-clock time.time_ns(), converted to seconds when serialized
     requests: int = 0
     input_tokens: int = 0
     output_tokens: int = 0
@@ -21,96 +27,120 @@ class TokenUsage:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
-        return asdict(self)
+        # Flat scalar fields, so a literal skips the dataclasses recursive copy
+        return {
+            'model': self.model,
+            'timestamp': self.timestamp_ns / 1_000_000_000,
+            'requests': self.requests,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'total_tokens': self.total_tokens,
+            'input_tokens_cached': self.input_tokens_cached,
+            'output_tokens_reasoning': self.output_tokens_reasoning,
+            'operation_type': self.operation_type,
+        }
     
     @classmethod
     def from_openai_usage(cls, model: str, usage: Any, operation_type: str = "unknown") -> "TokenUsage":
         """Create TokenUsage from OpenAI usage object."""
+        try:
+            # One C-level lookup for the common case where the SDK usage object has every field
+            requests, input_tokens, output_tokens, total_tokens, input_details, output_details = _USAGE_FIELDS_GETTER(usage)
+        except AttributeError:
+            requests = getattr(usage, 'requests', 1)
+            input_tokens = getattr(usage, 'input_tokens', 0)
+            output_tokens = getattr(usage, 'output_tokens', 0)
+            total_tokens = getattr(usage, 'total_tokens', 0)
+            input_details = getattr(usage, 'input_tokens_details', None)
+            output_details = getattr(usage, 'output_tokens_details', None)
+        
         return cls(
             model=model,
-            timestamp=time.time(),
-            requests=getattr(usage, 'requests', 1),
-            input_tokens=getattr(usage, 'input_tokens', 0),
-            output_tokens=getattr(usage, 'output_tokens', 0),
-            total_tokens=getattr(usage, 'total_tokens', 0),
-            input_tokens_cached=getattr(getattr(usage, 'input_tokens_details', None), 'cached_tokens', 0) or 0,
-            output_tokens_reasoning=getattr(getattr(usage, 'output_tokens_details', None), 'reasoning_tokens', 0) or 0,
+            timestamp_ns=time.time_ns(),
+            requests=requests,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+            input_tokens_cached=(getattr(input_details, 'cached_tokens', 0) or 0) if input_details else 0,
+            output_tokens_reasoning=(getattr(output_details, 'reasoning_tokens', 0) or 0) if output_details else 0,
             operation_type=operation_type
         )
 
 
+# Field order of the per-model and per-operation total lists
+USAGE_FIELDS = ('requests', 'input_tokens', 'output_tokens', 'total_tokens',
+                'input_tokens_cached', 'output_tokens_reasoning')
+
+def _totals_to_dict(totals: List[int]) -> Dict[str, int]:
+    """Convert a totals list (in USAGE_FIELDS order) to a field-name dict."""
+    return dict(zip(USAGE_FIELDS, totals))
+
+def _markdown_usage_line(name: str, totals: List[int]) -> str:
+    """Format one per-model or per-operation bullet from a totals list."""
+    cached = totals[4]
+    reasoning = totals[5]
+    # Format the optional breakdown directly rather than joining a temporary list
+    if cached and reasoning:
+        cost_info = f" ({cached:,} cached, {reasoning:,} reasoning)"
+    elif cached:
+        cost_info = f" ({cached:,} cached)"
+    elif reasoning:
+        cost_info = f" ({reasoning:,} reasoning)"
+    else:
+        cost_info = ""
+    return f"- **{name}:** {totals[3]:,} tokens ({totals[0]:,} requests{cost_info})"
+
 class TokenTracker:
     """Tracks token usage across multiple model calls."""
     
     def __init__(self):
         self.usage_history: List[TokenUsage] = []
-        self.totals_by_model: Dict[str, Dict[str, int]] = defaultdict(lambda: {
-            'requests': 0,
-            'input_tokens': 0,
-            'output_tokens': 0,
-            'total_tokens': 0,
-            'input_tokens_cached': 0,
-            'output_tokens_reasoning': 0
-        })
-        self.totals_by_operation: Dict[str, Dict[str, int]] = defaultdict(lambda: {
-            'requests': 0,
-            'input_tokens': 0,
-            'output_tokens': 0,
-            'total_tokens': 0,
-            'input_tokens_cached': 0,
-            'output_tokens_reasoning': 0
-        })
+        self.version = 0  # Incremented on every add_usage, lets callers cache derived reports
+        # Running totals as lists in USAGE_FIELDS order (index adds are cheaper than dict-key adds)
+        self._totals = [0] * len(USAGE_FIELDS)
+        self.totals_by_model: Dict[str, List[int]] = defaultdict(lambda: [0] * len(USAGE_FIELDS))
+        self.totals_by_operation: Dict[str, List[int]] = defaultdict(lambda: [0] * len(USAGE_FIELDS))
+        # Formatted outputs, keyed by final_report, valid until the next add_usage
+        self._md_cache: Dict[bool, str] = {}
+        self._summary_cache: Optional[str] = None
     
     def add_usage(self, usage: TokenUsage):
         """Add a token usage record."""
         self.usage_history.append(usage)
+        self.version += 1
         
-        # Update model totals
-        model_totals = self.totals_by_model[usage.model]
-        model_totals['requests'] += usage.requests
-        model_totals['input_tokens'] += usage.input_tokens
-        model_totals['output_tokens'] += usage.output_tokens
-        model_totals['total_tokens'] += usage.total_tokens
-        model_totals['input_tokens_cached'] += usage.input_tokens_cached
-        model_totals['output_tokens_reasoning'] += usage.output_tokens_reasoning
+        # Update overall, model and operation totals
+        for totals in (self._totals, self.totals_by_model[usage.model], self.totals_by_operation[usage.operation_type]):
+            totals[0] += usage.requests
+            totals[1] += usage.input_tokens
+            totals[2] += usage.output_tokens
+            totals[3] += usage.total_tokens
+            totals[4] += usage.input_tokens_cached
+            totals[5] += usage.output_tokens_reasoning
         
-        # Update operation totals
-        op_totals = self.totals_by_operation[usage.operation_type]
-        op_totals['requests'] += usage.requests
-        op_totals['input_tokens'] += usage.input_tokens
-        op_totals['output_tokens'] += usage.output_tokens
-        op_totals['total_tokens'] += usage.total_tokens
-        op_totals['input_tokens_cached'] += usage.input_tokens_cached
-        op_totals['output_tokens_reasoning'] += usage.output_tokens_reasoning
+        self._md_cache.clear()
+        self._summary_cache = None
+    
+    def has_records(self) -> bool:
+        """Check whether any usage has been tracked."""
+        return bool(self.usage_history)
+    
+    @property
+    def total_tokens(self) -> int:
+        """Total tokens across all tracked usage, kept as a running sum."""
+        return self._totals[3]
     
     def get_model_summary(self) -> Dict[str, Dict[str, int]]:
         """Get token usage summary by model."""
-        return dict(self.totals_by_model)
+        return {model: _totals_to_dict(totals) for model, totals in self.totals_by_model.items()}
     
     def get_operation_summary(self) -> Dict[str, Dict[str, int]]:
         """Get token usage summary by operation type."""
-        return dict(self.totals_by_operation)
+        return {operation: _totals_to_dict(totals) for operation, totals in self.totals_by_operation.items()}
     
     def get_total_usage(self) -> Dict[str, int]:
         """Get overall token usage totals."""
-        totals = {
-            'requests': 0,
-            'input_tokens': 0,
-            'output_tokens': 0,
-            'total_tokens': 0,
-            'input_tokens_cached': 0,
-            'output_tokens_reasoning': 0
-        }
-        
-        for usage in self.usage_history:
-            totals['requests'] += usage.requests
-            totals['input_tokens'] += usage.input_tokens
-            totals['output_tokens'] += usage.output_tokens
-            totals['total_tokens'] += usage.total_tokens
-            totals['input_tokens_cached'] += usage.input_tokens_cached
-            totals['output_tokens_reasoning'] += usage.output_tokens_reasoning
-        
-        return totals
+        return _totals_to_dict(self._totals)
     
     def get_usage_report(self) -> Dict[str, Any]:
         """Get comprehensive usage report."""
@@ -123,88 +153,110 @@ class TokenTracker:
     
     def save_to_file(self, filepath: str):
         """Save token usage report to JSON file."""
-        with open(filepath, 'w') as f:
-            json.dump(self.get_usage_report(), f, indent=2)
+        # to_dict converts the integer timestamps back to the float seconds the file has always used
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(self.get_usage_report(), option=orjson.OPT_INDENT_2))
     
     def format_markdown_section(self, final_report: bool = False) -> str:
         """Format token usage statistics as markdown section for reports."""
+        if final_report in self._md_cache:
+            return self._md_cache[final_report]
+        
         total_usage = self.get_total_usage()
-        model_usage = self.get_model_summary()
-        operation_usage = self.get_operation_summary()
         
         # Use different header for final reports to clarify these tokens are not included in cost estimates
         header = "## Token Usage Statistics (not included in cost estimates)" if final_report else "## Token Usage Statistics"
         
-        lines = [
+        parts = [
             header,
             "",
             f"**Total Usage:** {total_usage['total_tokens']:,} tokens ({total_usage['input_tokens']:,} input, {total_usage['output_tokens']:,} output)",
         ]
-        
         if total_usage['input_tokens_cached'] > 0:
-            lines.append(f"**Cached Tokens:** {total_usage['input_tokens_cached']:,}")
-        
+            parts.append(f"**Cached Tokens:** {total_usage['input_tokens_cached']:,}")
         if total_usage['output_tokens_reasoning'] > 0:
-            lines.append(f"**Reasoning Tokens:** {total_usage['output_tokens_reasoning']:,}")
-        
-        lines.extend([
-            f"**Total Requests:** {total_usage['requests']:,}",
-            "",
-            "### By Model:"
-        ])
+            parts.append(f"**Reasoning Tokens:** {total_usage['output_tokens_reasoning']:,}")
+        parts += (f"**Total Requests:** {total_usage['requests']:,}", "", "### By Model:")
+        parts += (_markdown_usage_line(model, totals) for model, totals in self.totals_by_model.items())
+        parts += ("", "### By Operation:")
+        parts += (_markdown_usage_line(operation, totals) for operation, totals in self.totals_by_operation.items())
         
-        for model, usage in model_usage.items():
-            cost_breakdown = []
-            if usage['input_tokens_cached'] > 0:
-                cost_breakdown.append(f"{usage['input_tokens_cached']:,} cached")
-            if usage['output_tokens_reasoning'] > 0:
-                cost_breakdown.append(f"{usage['output_tokens_reasoning']:,} reasoning")
-            
-            cost_info = f" ({', '.join(cost_breakdown)})" if cost_breakdown else ""
-            lines.append(f"- **{model}:** {usage['total_tokens']:,} tokens ({usage['requests']:,} requests{cost_info})")
-        
-        lines.extend([
-            "",
-            "### By Operation:"
-        ])
-        
-        for operation, usage in operation_usage.items():
-            cost_breakdown = []
-            if usage['input_tokens_cached'] > 0:
-                cost_breakdown.append(f"{usage['input_tokens_cached']:,} cached")
-            if usage['output_tokens_reasoning'] > 0:
-                cost_breakdown.append(f"{usage['output_tokens_reasoning']:,} reasoning")
-            
-            cost_info = f" ({', '.join(cost_breakdown)})" if cost_breakdown else ""
-            lines.append(f"- **{operation}:** {usage['total_tokens']:,} tokens ({usage['requests']:,} requests{cost_info})")
-        
-        return "\n".join(lines)
+        section = "\n".join(parts)
+        self._md_cache[final_report] = section
+        return section
 
     def print_summary(self):
         """Print a human-readable summary of token usage."""
-        print("\n📊 Token Usage Summary")
-        print("=" * 50)
-        
+        if self._summary_cache is None:
+            self._summary_cache = self._format_summary()
+        print(self._summary_cache)
+    
+    def _format_summary(self) -> str:
+        """Build the text printed by print_summary."""
         total = self.get_total_usage()
-        print(f"Overall: {total['total_tokens']:,} tokens ({total['input_tokens']:,} input, {total['output_tokens']:,} output)")
-        
-        # Always show cached and reasoning tokens for debugging
-        print(f"Cached tokens: {total['input_tokens_cached']:,}")
-        print(f"Reasoning tokens: {total['output_tokens_reasoning']:,}")
-        
-        print(f"Total requests: {total['requests']:,}")
-        
-        print("\nBy Model:")
-        for model, usage in self.totals_by_model.items():
+        lines = [
+            "\n📊 Token Usage Summary",
+            "=" * 50,
+            f"Overall: {total['total_tokens']:,} tokens ({total['input_tokens']:,} input, {total['output_tokens']:,} output)",
+            # Always show cached and reasoning tokens for debugging
+            f"Cached tokens: {total['input_tokens_cached']:,}",
+            f"Reasoning tokens: {total['output_tokens_reasoning']:,}",
+            f"Total requests: {total['requests']:,}",
+            "\nBy Model:",
+        ]
+        for model, usage in self.get_model_summary().items():
             cached_info = f", {usage['input_tokens_cached']:,} cached" if usage['input_tokens_cached'] > 0 else ""
             reasoning_info = f", {usage['output_tokens_reasoning']:,} reasoning" if usage['output_tokens_reasoning'] > 0 else ""
-            print(f"  {model}: {usage['total_tokens']:,} tokens ({usage['requests']:,} requests{cached_info}{reasoning_info})")
+            lines.append(f"  {model}: {usage['total_tokens']:,} tokens ({usage['requests']:,} requests{cached_info}{reasoning_info})")
         
-        print("\nBy Operation:")
-        for operation, usage in self.totals_by_operation.items():
+        lines.append("\nBy Operation:")
+        for operation, usage in self.get_operation_summary().items():
             cached_info = f", {usage['input_tokens_cached']:,} cached" if usage['input_tokens_cached'] > 0 else ""
             reasoning_info = f", {usage['output_tokens_reasoning']:,} reasoning" if usage['output_tokens_reasoning'] > 0 else ""
-            print(f"  {operation}: {usage['total_tokens']:,} tokens ({usage['requests']:,} requests{cached_info}{reasoning_info})")
+            lines.append(f"  {operation}: {usage['total_tokens']:,} tokens ({usage['requests']:,} requests{cached_info}{reasoning_info})")
+        return "\n".join(lines)
+
+
+def format_cost_table(by_model: Dict[str, Dict[str, int]]) -> str:
+    """Format a markdown cost table for per-model token totals, priced with MODEL_PRICING."""
+    if not by_model:
+        return "No token usage was recorded for this workflow."
+    
+    lines = [
+        f"Prices: OpenAI standard tier, USD per 1M tokens, as of {PRICING_UPDATED}",
+        "",
+        "| Model | Input tokens | Cached input tokens | Output tokens (reasoning) | Cost |",
+        "|---|---:|---:|---:|---:|",
+    ]
+    grand_total = 0.0
+    unpriced = []
+    for model, usage in by_model.items():
+        input_tokens = usage['input_tokens']
+        cached_tokens = usage['input_tokens_cached']
+        output_tokens = usage['output_tokens']
+        price = MODEL_PRICING.get(model)
+        if price is None:
+            unpriced.append(model)
+            cost_text = "not priced"
+        else:
+            cached_rate = price['cached'] if price['cached'] is not None else price['input']
+            # Cached tokens are part of input_tokens; only bill them at the cached rate
+            cost = (
+                (input_tokens - cached_tokens) * price['input']
+                + cached_tokens * cached_rate
+                + output_tokens * price['output']
+            ) / 1_000_000
+            grand_total += cost
+            cost_text = f"${cost:,.2f}"
+        lines.append(
+            f"| {model} | {input_tokens:,} | {cached_tokens:,} | "
+            f"{output_tokens:,} ({usage['output_tokens_reasoning']:,}) | {cost_text} |"
+        )
+    lines.append(f"| **Total** | | | | **${grand_total:,.2f}** |")
+    
+    if unpriced:
+        lines.extend(["", f"No price on file for: {', '.join(unpriced)} (excluded from the total)"])
+    return "\n".join(lines)
 
 
 # Global token tracker instance
@@ -1,21 +1,256 @@
 """Custom tools for the agentic research system."""
 
+import asyncio
+import ipaddress
+import socket
+import time
+import weakref
+from collections import OrderedDict, defaultdict
 from agents import function_tool
-from typing import Dict, Any
-import requests
-from urllib.parse import urlparse
+from typing import Awaitable, Callable, Dict, Any, Hashable, List, Mapping, Optional
+import httpx
+from urllib.parse import ParseResult, urlparse, urlunparse
+from config import TOOL_QPS, VERIFY_CONCURRENCY, VERIFY_URLS_MAX
+
+class HostRateLimiter:
+    """Spaces out calls per host so bursts of tool calls stay under provider rate limits."""
+    
+    def __init__(self, qps: Mapping[str, float]):
+        self._qps = qps
+        self._next: Dict[str, float] = defaultdict(float)
+        # One lock per event loop: asyncio locks bind to the loop they are first contended on
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+    
+    def _lock(self) -> asyncio.Lock:
+        """Get the lock for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+    
+    async def acquire(self, host: str):
+        """Wait until the next call slot for host is due."""
+        interval = 1.0 / self._qps.get(host, self._qps["default"])
+        async with self._lock():
+            now = time.monotonic()
+            slot = max(now, self._next[host])
+            self._next[host] = slot + interval
+        # Sleep outside the lock so other hosts are not held up
+        await asyncio.sleep(slot - now)
+
+class AsyncTTLCache:
+    """
+    LRU cache with expiry for async tool results.
+    
+    Concurrent calls for the same key share one in-flight request instead of each
+    hitting the network.
+    """
+    
+    def __init__(self, maxsize: int = 512, ttl: float = 3600,
+                 should_cache: Optional[Callable[[Any], bool]] = None):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._should_cache = should_cache
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+    
+    async def get_or_call(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached result for key, or await func() once and cache its result."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # Shielded so one cancelled caller doesn't cancel the request for the others
+        return await asyncio.shield(task)
+    
+    def discard(self, key: Hashable):
+        """Drop a cached result so the next get_or_call() fetches it again."""
+        self._entries.pop(key, None)
+    
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        """Move a completed in-flight request into the cache (exceptions and rejected results are not)."""
+        del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self._should_cache is not None and not self._should_cache(task.result()):
+            return
+        self._entries[key] = (time.monotonic() + self._ttl, task.result())
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+def normalize_url(url: str) -> str:
+    """Cache key form of a URL: lowercase scheme and host, no fragment, no trailing slash."""
+    return _normalize_parsed_url(urlparse(url))
+
+def _normalize_parsed_url(parsed: ParseResult) -> str:
+    """normalize_url() for an already parsed URL."""
+    return urlunparse((
+        parsed.scheme.lower(), parsed.netloc.lower(), parsed.path.rstrip("/"),
+        parsed.params, parsed.query, ""
+    ))
+
+# HTTP clients for URL checks, one per event loop (connection pools are loop-bound).
+# Keep-alive and HTTP/2 let repeat and concurrent checks to a host share connections.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get the URL-check client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(10.0),
+            # Only status and headers are used: ask for unencoded bodies so nothing is decompressed
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Research Bot) URL Verification Tool',
+                'Accept-Encoding': 'identity',
+            },
+        )
+        _http_clients[loop] = client
+    return client
+
+async def close_http_client():
+    """Close the running event loop's URL-check client, if one was created."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+# Shared by verify_url and the DeepWiki MCP server
+tool_rate_limiter = HostRateLimiter(TOOL_QPS)
+# Only successful checks are cached, so transient failures are retried on the next call
+_verify_url_cache = AsyncTTLCache(maxsize=2048, ttl=600, should_cache=lambda result: result.get("success"))
+# Bound URL checks in flight across all verify_url and verify_urls calls, including
+# parallel tool calls, rather than per batch; one per event loop, like _http_clients
+_verify_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _get_verify_semaphore() -> asyncio.Semaphore:
+    """Get the URL-check semaphore for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    semaphore = _verify_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _verify_semaphores[loop] = asyncio.Semaphore(VERIFY_CONCURRENCY)
+    return semaphore
 
 @function_tool
-def verify_url(url: str) -> Dict[str, Any]:
+async def verify_url(url: str, force: bool = False) -> Dict[str, Any]:
     """
     Verify if a URL or HTTP/HTTPS API endpoint exists and is accessible.
     
     Args:
         url: The URL to verify (must be properly formatted with http:// or https://)
+        force: Re-check the URL even if it was verified recently
         
     Returns:
         Dictionary containing verification results with status code, success flag, and details
     """
+    return await _check_url(url, force)
+
+@function_tool
+async def verify_urls(urls: List[str], force: bool = False) -> Dict[str, Any]:
+    """
+    Verify several URLs or HTTP/HTTPS API endpoints in one call, checking them in parallel.
+    
+    Args:
+        urls: The URLs to verify (at most 100; each must start with http:// or https://)
+        force: Re-check the URLs even if they were verified recently
+        
+    Returns:
+        Dictionary mapping each URL to its verification result (same fields as verify_url),
+        or a single result with success False and an error if more than 100 URLs are passed
+    """
+    return await _verify_urls(urls, force)
+
+async def _verify_urls(urls: List[str], force: bool = False) -> Dict[str, Any]:
+    """Batch URL check behind verify_urls."""
+    if len(urls) > VERIFY_URLS_MAX:
+        # One top-level error result, not a URL-to-result map, so it can't be read as a URL entry
+        return {
+            "success": False,
+            "status_code": None,
+            "error": f"Too many URLs ({len(urls)}) - pass at most {VERIFY_URLS_MAX} per call",
+            "accessible": False,
+            "response_time_ms": None
+        }
+    
+    # _check_url bounds the number of requests in flight
+    unique_urls = list(dict.fromkeys(urls))
+    results = await asyncio.gather(*(_check_url(url, force) for url in unique_urls))
+    return dict(zip(unique_urls, results))
+
+def _is_internal_ip(address: str) -> bool:
+    """Check whether an IP address is anything but public (private, loopback, link-local, reserved, multicast, ...)."""
+    ip = ipaddress.ip_address(address)
+    # is_global does not exclude multicast on every Python version, so check it (and reserved) explicitly
+    return not ip.is_global or ip.is_multicast or ip.is_reserved
+
+async def _resolves_to_internal(host: str) -> bool:
+    """Check whether host is, or resolves to, an internal address (e.g. localhost, 169.254.169.254)."""
+    try:
+        return _is_internal_ip(host)
+    except ValueError:
+        pass  # Not an IP literal, resolve it
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        # Unresolvable hosts are left to the HTTP request to report
+        return False
+    return any(_is_internal_ip(info[4][0]) for info in infos)
+
+class _InternalAddressBlocked(Exception):
+    """A redirect pointed a URL check at an internal address."""
+
+async def _send_checked(client: httpx.AsyncClient, method: str, url: httpx.URL) -> httpx.Response:
+    """
+    Send a status-only request, following redirects one hop at a time.
+    
+    Every redirect target is checked with _resolves_to_internal before it is requested,
+    so a public URL cannot redirect the check into the local network. Bodies are never
+    read; the returned response is closed.
+    """
+    request = client.build_request(method, url)
+    for _ in range(client.max_redirects + 1):
+        response = await client.send(request, stream=True)
+        await response.aclose()
+        if response.next_request is None:
+            return response
+        request = response.next_request
+        if await _resolves_to_internal(request.url.host):
+            raise _InternalAddressBlocked(request.url.host)
+    raise httpx.TooManyRedirects("Exceeded maximum allowed redirects.", request=request)
+
+async def _check_url(url: str, force: bool = False) -> Dict[str, Any]:
+    """Rate-limited, cached check of a single URL shared by verify_url and verify_urls."""
+    if not isinstance(url, str):
+        return await _verify_url(url)
+    
+    # Parsed once for both the rate limit host and the cache key
+    parsed = urlparse(url)
+    
+    async def check() -> Dict[str, Any]:
+        # Wait for the host's rate-limit slot before taking a semaphore slot, so a batch
+        # of URLs on one host does not hold every slot while it sleeps
+        await tool_rate_limiter.acquire(parsed.netloc)
+        async with _get_verify_semaphore():
+            return await _verify_url(url)
+    
+    # Reports repeat URLs across critique and refinement passes; check each one once
+    key = _normalize_parsed_url(parsed)
+    if force:
+        _verify_url_cache.discard(key)
+    return await _verify_url_cache.get_or_call(key, check)
+
+async def _verify_url(url: str) -> Dict[str, Any]:
+    """Uncached URL check behind verify_url and verify_urls."""
     if not url or not isinstance(url, str):
         return {
             "success": False,
@@ -25,10 +260,10 @@ def verify_url(url: str) -> Dict[str, Any]:
             "response_time_ms": None
         }
     
-    # Basic URL validation
+    # Basic URL validation; the parsed httpx.URL is reused for the requests so httpx doesn't re-parse it
     try:
-        parsed = urlparse(url)
-        if not parsed.scheme or not parsed.netloc:
+        parsed = httpx.URL(url)
+        if not parsed.scheme or not parsed.host:
             return {
                 "success": False,
                 "status_code": None,
@@ -54,35 +289,33 @@ def verify_url(url: str) -> Dict[str, Any]:
             "response_time_ms": None
         }
     
+    # Never probe the local network from research-supplied URLs
+    if await _resolves_to_internal(parsed.host):
+        return {
+            "success": False,
+            "status_code": None,
+            "error": "Private/loopback address blocked",
+            "accessible": False,
+            "response_time_ms": None
+        }
+    
     # Attempt to verify the URL
+    client = _get_http_client()
     try:
-        import time
         start_time = time.time()
         
         # Use HEAD request first (faster, less bandwidth)
-        response = requests.head(
-            url, 
-            timeout=10,
-            allow_redirects=True,
-            headers={'User-Agent': 'Mozilla/5.0 (Research Bot) URL Verification Tool'}
-        )
+        response = await _send_checked(client, "HEAD", parsed)
         
         end_time = time.time()
         response_time_ms = round((end_time - start_time) * 1000, 2)
         
-        # If HEAD fails, try GET (some servers don't support HEAD)
+        # If HEAD fails, try GET (some servers don't support HEAD); only status and headers are read
         if response.status_code == 405:  # Method Not Allowed
             start_time = time.time()
-            response = requests.get(
-                url, 
-                timeout=10,
-                allow_redirects=True,
-                headers={'User-Agent': 'Mozilla/5.0 (Research Bot) URL Verification Tool'},
-                stream=True  # Don't download full content
-            )
+            response = await _send_checked(client, "GET", parsed)
             end_time = time.time()
             response_time_ms = round((end_time - start_time) * 1000, 2)
-            response.close()  # Close the stream
         
         # Determine if URL is accessible (2xx or 3xx status codes)
         accessible = 200 <= response.status_code < 400
@@ -93,11 +326,19 @@ def verify_url(url: str) -> Dict[str, Any]:
             "error": None,
             "accessible": accessible,
             "response_time_ms": response_time_ms,
-            "final_url": response.url if response.url != url else None,  # Show redirect target
-            "status_description": f"{response.status_code} {response.reason}" if hasattr(response, 'reason') else str(response.status_code)
+            "final_url": str(response.url) if response.url != parsed else None,  # Show redirect target
+            "status_description": f"{response.status_code} {response.reason_phrase}"
         }
         
-    except requests.exceptions.Timeout:
+    except _InternalAddressBlocked as e:
+        return {
+            "success": False,
+            "status_code": None,
+            "error": f"Private/loopback address blocked (redirect to {e})",
+            "accessible": False,
+            "response_time_ms": None
+        }
+    except httpx.TimeoutException:
         return {
             "success": False,
             "status_code": None,
@@ -105,7 +346,7 @@ def verify_url(url: str) -> Dict[str, Any]:
             "accessible": False,
             "response_time_ms": None
         }
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         return {
             "success": False,
             "status_code": None,
@@ -113,7 +354,7 @@ def verify_url(url: str) -> Dict[str, Any]:
             "accessible": False,
             "response_time_ms": None
         }
-    except requests.exceptions.TooManyRedirects:
+    except httpx.TooManyRedirects:
         return {
             "success": False,
             "status_code": None,
@@ -121,7 +362,7 @@ def verify_url(url: str) -> Dict[str, Any]:
             "accessible": False,
             "response_time_ms": None
         }
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return {
             "success": False,
             "status_code": None,